@@ -5,13 +5,14 @@ import asyncio
 import json
 import os
 import re
-import time
+import threading
+import uuid
 from datetime import datetime
 from typing import Optional
 
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from config import get_model, load_prompts
+from config import get_model, load_prompts, parse_countries, to_json
 
 # ADK imports
 from google.adk.agents import LlmAgent
@@ -20,6 +21,27 @@ from google.adk.sessions import InMemorySessionService
 from google.adk.tools import google_search
 from google.genai import types
 
+_JSON_BLOCK = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+
+def _balanced_object(text: str, start: int) -> Optional[str]:
+    """Slice the {...} object opening at text[start], tracking string state. O(n), no backtracking."""
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped: escaped = False
+            elif ch == '\\': escaped = True
+            elif ch == '"': in_string = False
+        elif ch == '"': in_string = True
+        elif ch == '{': depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
 def parse_json_response(response: str) -> dict:
     """Try to parse JSON from the agent response."""
     try:
@@ -28,39 +50,66 @@ def parse_json_response(response: str) -> dict:
         pass
     
     # Try extracting JSON block from markdown
-    json_block = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+    json_block = _JSON_BLOCK.search(response)
     if json_block:
         try:
             return json.loads(json_block.group(1))
         except json.JSONDecodeError:
             pass
             
-    # Try finding any JSON object
-    json_match = re.search(r'\{.*\}', response, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
+    # Try finding any JSON object: the balanced object at the first '{',
+    # then everything from the first '{' to the last '}'
+    start, end = response.find('{'), response.rfind('}')
+    if start != -1 and end > start:
+        for candidate in (_balanced_object(response, start), response[start:end + 1]):
+            if candidate:
+                try:
+                    return json.loads(candidate)
+                except json.JSONDecodeError:
+                    pass
             
     return {"error": "Could not parse JSON response", "raw_response": response[:500]}
 
-async def run_adk_agent_async(country: str) -> str:
+LOOKBACK_DAYS = 60
+
+# Set up ADK using API key from env
+# Note: google.adk uses GOOGLE_API_KEY env var by default, or we can pass it
+if not os.environ.get("GOOGLE_API_KEY"):
+    os.environ["GOOGLE_API_KEY"] = os.environ.get("GEMINI_API_KEY", "")
+
+
+def _adk_instruction(context) -> str:
+    """Format the prompts.yaml instruction with the country/dates stored in the session state."""
+    base_instruction = load_prompts().get('economic_news_adk_instruction', '')
+    return base_instruction.format(**context.state)
+
+
+# Built once per process: the agent reads its per-request parameters from session state
+session_service = InMemorySessionService()
+
+agent = LlmAgent(
+    name="economic_news_adk_worker",
+    model="gemini-2.0-flash", 
+    instruction=_adk_instruction,
+    tools=[google_search],
+)
+
+runner = Runner(
+    agent=agent,
+    app_name="economic_news_service",
+    session_service=session_service
+)
+
+# Long-lived loop thread: every tool call reuses the same loop (and its HTTP connections)
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="economic-news-adk", daemon=True).start()
+
+
+async def run_adk_agent_async(country: str, end_date: Optional[str] = None) -> str:
     """Run the ADK agent asynchronously to fetch news."""
     
-    # Load instruction from prompts.yaml
-    prompts = load_prompts()
-    base_instruction = prompts.get('economic_news_adk_instruction', '')
-    
-    lookback_days = 60
-    end_date = datetime.now().strftime('%Y-%m-%d')
-    
-    # Format the instruction with specific parameters
-    instruction = base_instruction.format(
-        country=country,
-        lookback_days=lookback_days,
-        end_date=end_date
-    )
+    lookback_days = LOOKBACK_DAYS
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
     
     search_prompt = f"""Search for the most important political and economic news about {country} 
 in the past {lookback_days} days (up to {end_date}). 
@@ -75,35 +124,15 @@ Specifically search for:
 Make multiple searches to cover both political AND economic news thoroughly.
 Return your findings as the specified JSON format."""
 
-    # Set up ADK using API key from env
-    # Note: google.adk uses GOOGLE_API_KEY env var by default, or we can pass it
-    if not os.environ.get("GOOGLE_API_KEY"):
-        os.environ["GOOGLE_API_KEY"] = os.environ.get("GEMINI_API_KEY", "")
-
-    session_service = InMemorySessionService()
-
-    # Create the ADK Agent
-    agent = LlmAgent(
-        name="economic_news_adk_worker",
-        model="gemini-2.0-flash", 
-        instruction=instruction,
-        tools=[google_search],
-    )
-
-    runner = Runner(
-        agent=agent,
-        app_name="economic_news_service",
-        session_service=session_service
-    )
-
     user_id = "orchestrator_user"
-    session_id = f"session_{country}_{int(time.time())}"
+    session_id = f"session_{country}_{uuid.uuid4().hex}"
 
     # Execution
-    session = await runner.session_service.create_session(
+    await session_service.create_session(
         app_name=runner.app_name,
         user_id=user_id,
-        session_id=session_id
+        session_id=session_id,
+        state={"country": country, "lookback_days": lookback_days, "end_date": end_date}
     )
 
     content = types.Content(
@@ -112,19 +141,49 @@ Return your findings as the specified JSON format."""
     )
 
     final_response = ""
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=content
-    ):
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if part.text:
-                        final_response += part.text
+    try:
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=content
+        ):
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    for part in event.content.parts:
+                        if part.text:
+                            final_response += part.text
+    finally:
+        # The session service is shared now; don't let finished sessions pile up
+        await session_service.delete_session(app_name=runner.app_name, user_id=user_id, session_id=session_id)
                         
     return final_response
 
+# (country, end_date) -> Task with the ADK response. The prompt only changes with the
+# date, so same-day repeats (and concurrent duplicates) share one Gemini call.
+_RESPONSE_CACHE = {}
+
+async def run_adk_agent_cached(country: str) -> str:
+    """run_adk_agent_async() memoized per country and day; failed or empty runs are not kept."""
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    key = (country.strip().lower(), end_date)
+    task = _RESPONSE_CACHE.get(key)
+    if task is None:
+        for stale in [k for k in _RESPONSE_CACHE if k[1] != end_date]:
+            del _RESPONSE_CACHE[stale]
+        task = _RESPONSE_CACHE[key] = asyncio.ensure_future(run_adk_agent_async(country, end_date))
+    try:
+        response = await asyncio.shield(task)
+    except Exception:
+        _RESPONSE_CACHE.pop(key, None)
+        raise
+    if not response:
+        _RESPONSE_CACHE.pop(key, None)
+    return response
+
+async def run_adk_batch(countries: list) -> list:
+    """Fan the per-country ADK runs out concurrently; failures come back as exceptions, in order."""
+    return await asyncio.gather(*(run_adk_agent_cached(c) for c in countries), return_exceptions=True)
+
 @tool
 def ask_economic_news_agent(country: str) -> str:
     """
@@ -138,14 +197,36 @@ def ask_economic_news_agent(country: str) -> str:
     """
     try:
         print(f"  ... 🌍 Connecting to Google ADK for {country} news ...")
-        # Run the async ADK agent synchronously so it works with LangGraph tools
-        response_text = asyncio.run(run_adk_agent_async(country))
+        # Run the async ADK agent on the shared loop and block so it works with LangGraph tools
+        response_text = asyncio.run_coroutine_threadsafe(run_adk_agent_cached(country), _LOOP).result()
         
         # Parse and re-dump to ensure it's clean JSON string, or just return text
         # If the Orchestrator expects a string, we return the raw response 
         # but parsing ensures we have valid JSON before returning
         parsed = parse_json_response(response_text)
-        return json.dumps(parsed, indent=2)
+        return to_json(parsed)
+        
+    except Exception as e:
+        return f"Error running Economic News Agent: {str(e)}"
+
+@tool
+def ask_economic_news_batch(countries: str) -> str:
+    """
+    Query the Economic News Agent for several countries at once; the searches run concurrently.
+    
+    Args:
+        countries (str): Comma-separated country names (e.g., "Afghanistan,Pakistan,Iran").
+        
+    Returns:
+        str: A JSON object mapping each country to its political/economic events, risks, and stability assessment.
+    """
+    names = parse_countries(countries)
+    try:
+        print(f"  ... 🌍 Connecting to Google ADK for {', '.join(names)} news ...")
+        responses = asyncio.run_coroutine_threadsafe(run_adk_batch(names), _LOOP).result()
+        results = {c: {"error": f"Error running Economic News Agent: {r}"} if isinstance(r, Exception) else parse_json_response(r)
+                   for c, r in zip(names, responses)}
+        return to_json(results)
         
     except Exception as e:
         return f"Error running Economic News Agent: {str(e)}"
@@ -156,7 +237,7 @@ def create_economic_news_agent():
     # This is the "router" or "shell" agent that just calls the tool
     return create_react_agent(
         model=get_model(), 
-        tools=[ask_economic_news_agent], 
+        tools=[ask_economic_news_agent, ask_economic_news_batch], 
         name="economic_news_agent", 
         prompt=prompts['economic_news_agent']
     )
@@ -1,59 +1,64 @@
 """Food Agent — FAOSTAT production, trade, food commodity prices"""
 
-import json
+import functools
 from typing import Optional
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from config import load_agent_data, filter_data, get_model, load_prompts
+from config import load_agent_data, filter_data, year_slice, get_model, load_prompts, reduce_col, to_json, TOOL_CACHE_SIZE
 
 df = load_agent_data("food")
+_COLS = frozenset(df.columns)
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_food_production(country: str, year: Optional[int] = None) -> str:
     """Get food production data for a country: crop areas, yields, production quantities, trade."""
     data = filter_data(df, country=country, year=year)
     if data.empty: return f"No food data for '{country}'" + (f" in {year}" if year else "")
     numeric_cols = data.select_dtypes(include='number').columns.tolist()
-    summary = {col: round(float(data[col].mean()),2) for col in numeric_cols if col != 'year' and data[col].notna().any()}
-    return json.dumps({"country": country, "period": str(year) if year else f"{int(data['year'].min())}-{int(data['year'].max())}",
-                        "indicators": summary}, indent=2)
+    summary = {col: v for col in numeric_cols if col != 'year' and (v := reduce_col(data[col], ndigits=2)) is not None}
+    return to_json({"country": country, "period": str(year) if year else f"{int(data['year'].min())}-{int(data['year'].max())}",
+                        "indicators": summary})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_food_trade_balance(country: str, year: Optional[int] = None) -> str:
     """Get food import/export balance for a country."""
     data = filter_data(df, country=country, year=year)
     if data.empty: return f"No food trade data for '{country}'"
     result = {"country": country}
-    if 'food_export_total_value' in data.columns: result["exports"] = round(float(data['food_export_total_value'].sum()),2)
-    if 'food_import_total_value' in data.columns: result["imports"] = round(float(data['food_import_total_value'].sum()),2)
-    if 'food_export_total_value' in data.columns and 'food_import_total_value' in data.columns:
+    if 'food_export_total_value' in _COLS: result["exports"] = round(float(data['food_export_total_value'].sum()),2)
+    if 'food_import_total_value' in _COLS: result["imports"] = round(float(data['food_import_total_value'].sum()),2)
+    if 'food_export_total_value' in _COLS and 'food_import_total_value' in _COLS:
         result["trade_balance"] = round(float(data['food_export_total_value'].sum() - data['food_import_total_value'].sum()),2)
         result["net_importer"] = result["trade_balance"] < 0
-    return json.dumps(result, indent=2)
+    return to_json(result)
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_food_prices(year: int) -> str:
     """Get global food commodity prices: wheat, rice, maize, soybeans, sugar, palm oil, fertilizers."""
-    data = df[df['year'] == year]
+    data = year_slice(df, year)
     if data.empty: return f"No food price data for {year}"
     price_cols = [c for c in data.columns if 'price' in c.lower()]
     if not price_cols: return "No price columns found"
     prices = {col: round(float(data[col].mean()),2) for col in price_cols if data[col].notna().any()}
-    return json.dumps({"year": year, "food_prices": prices}, indent=2)
+    return to_json({"year": year, "food_prices": prices})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def find_food_vulnerable_countries(year: int, top_n: int = 15) -> str:
     """Find countries most vulnerable to food supply disruption based on import dependency and low production."""
-    data = df[df['year'] == year].copy()
+    data = year_slice(df, year)
     if data.empty: return f"No data for {year}"
-    if 'food_import_total_value' in data.columns and 'food_export_total_value' in data.columns:
-        data['import_ratio'] = data['food_import_total_value'] / (data['food_export_total_value'].clip(lower=1))
+    if 'food_import_total_value' in _COLS and 'food_export_total_value' in _COLS:
+        data = data.assign(import_ratio=data['food_import_total_value'] / data['food_export_total_value'].clip(lower=1))
         vulnerable = data.nlargest(top_n, 'import_ratio')[['country_name','import_ratio','food_import_total_value','food_export_total_value']]
-        return json.dumps({"year": year, "vulnerable": vulnerable.to_dict('records')}, indent=2, default=str)
+        return to_json({"year": year, "vulnerable": vulnerable.to_dict('records')})
     return "Insufficient data for vulnerability analysis"
 
 
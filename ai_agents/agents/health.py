@@ -1,58 +1,64 @@
 """Health Agent — Healthcare capacity, expenditure, vaccination infrastructure"""
 
-import json
+import functools
 from typing import Optional
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from config import load_agent_data, filter_data, get_model, load_prompts
+import numpy as np
+from config import load_agent_data, filter_data, year_slice, match_countries, parse_countries, get_model, load_prompts, reduce_cols, to_json, TOOL_CACHE_SIZE
 
 df = load_agent_data("health")
+_COLS = frozenset(df.columns)
+# get_health_capacity: result key -> (column, NaN-aware reduction, round digits; None = int)
+_CAPACITY = {key: spec for key, spec in {
+    "expenditure_pct_gdp": ('health_expenditure_pct_gdp', np.nanmean, 3),
+    "vaccination_coverage_pct": ('vaccination_coverage_pct', np.nanmax, 2),
+    "vaccination_daily_capacity": ('vaccination_capacity_daily', np.nanmax, None),
+    "active_who_alerts": ('active_who_alerts', np.nansum, None),
+    "outbreak_deaths": ('outbreak_deaths', np.nansum, None),
+}.items() if spec[0] in _COLS}
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_health_capacity(country: str, year: Optional[int] = None) -> str:
     """Get healthcare capacity: health expenditure % GDP, vaccination coverage, outbreak burden."""
     data = filter_data(df, country=country, year=year)
     if data.empty: return f"No health data for '{country}'" + (f" in {year}" if year else "")
     result = {"country": country, "period": str(year) if year else "all available"}
-    if 'health_expenditure_pct_gdp' in data.columns and data['health_expenditure_pct_gdp'].notna().any():
-        result["expenditure_pct_gdp"] = round(float(data['health_expenditure_pct_gdp'].mean()),3)
-    if 'vaccination_coverage_pct' in data.columns and data['vaccination_coverage_pct'].notna().any():
-        result["vaccination_coverage_pct"] = round(float(data['vaccination_coverage_pct'].max()),2)
-    if 'vaccination_capacity_daily' in data.columns and data['vaccination_capacity_daily'].notna().any():
-        result["vaccination_daily_capacity"] = int(data['vaccination_capacity_daily'].max())
-    if 'active_who_alerts' in data.columns and data['active_who_alerts'].notna().any():
-        result["active_who_alerts"] = int(data['active_who_alerts'].sum())
-    if 'outbreak_deaths' in data.columns and data['outbreak_deaths'].notna().any():
-        result["outbreak_deaths"] = int(data['outbreak_deaths'].sum())
-    return json.dumps(result, indent=2)
+    # one 2-D pass per reduction kind instead of one pass per column
+    reduced = {fn: reduce_cols(data, [c for c, f, _ in _CAPACITY.values() if f is fn], fn)
+               for fn in {f for _, f, _ in _CAPACITY.values()}}
+    for key, (col, fn, ndigits) in _CAPACITY.items():
+        value = reduced[fn][col]
+        if value is not None:
+            result[key] = round(value, ndigits) if ndigits is not None else int(value)
+    return to_json(result)
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def find_weakest_health_systems(year: Optional[int] = None, top_n: int = 15) -> str:
     """Find countries with weakest healthcare systems (lowest expenditure, lowest vaccination)."""
-    data = df.copy()
-    if year: data = data[data['year'] == year]
-    if data.empty or 'health_expenditure_pct_gdp' not in data.columns: return "No health expenditure data"
-    weak = data.dropna(subset=['health_expenditure_pct_gdp']).groupby('country_name').agg(
+    data = year_slice(df, year) if year else df
+    if data.empty or 'health_expenditure_pct_gdp' not in _COLS: return "No health expenditure data"
+    weak = data.dropna(subset=['health_expenditure_pct_gdp']).groupby('country_name', observed=True).agg(
         avg_expenditure=('health_expenditure_pct_gdp','mean')).sort_values('avg_expenditure').head(top_n).reset_index()
-    return json.dumps({"year": year or "all", "weakest_systems": weak.to_dict('records')}, indent=2)
+    return to_json({"year": year or "all", "weakest_systems": weak.to_dict('records')})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def compare_health_systems(countries: str, year: Optional[int] = None) -> str:
     """Compare healthcare capacity across countries."""
-    results = []
-    for c in [x.strip() for x in countries.split(',')]:
-        data = filter_data(df, country=c, year=year)
-        if data.empty: continue
-        entry = {"country": c}
-        if 'health_expenditure_pct_gdp' in data.columns and data['health_expenditure_pct_gdp'].notna().any():
-            entry["expenditure_pct_gdp"] = round(float(data['health_expenditure_pct_gdp'].mean()),3)
-        if 'vaccination_coverage_pct' in data.columns and data['vaccination_coverage_pct'].notna().any():
-            entry["vaccination_pct"] = round(float(data['vaccination_coverage_pct'].max()),2)
-        results.append(entry)
-    return json.dumps({"year": year or "all", "comparison": results}, indent=2)
+    names = parse_countries(countries)
+    stats = {"expenditure_pct_gdp": ('health_expenditure_pct_gdp', 'mean', 3), "vaccination_pct": ('vaccination_coverage_pct', 'max', 2)}
+    stats = {k: v for k, v in stats.items() if v[0] in _COLS}
+    grouped = match_countries(df, names, year=year).groupby('_query', sort=False)
+    agg = grouped.agg(**{k: (col, fn) for k, (col, fn, _) in stats.items()}).to_dict('index') if stats else {}
+    results = [{"country": c, **{k: round(float(v), stats[k][2]) for k, v in agg.get(c, {}).items() if v == v}}
+               for c in names if c in grouped.groups]
+    return to_json({"year": year or "all", "comparison": results})
 
 
 ALL_TOOLS = [get_health_capacity, find_weakest_health_systems, compare_health_systems]
@@ -1,94 +1,110 @@
 """News Stats Agent — GDELT event analysis"""
 
-import json
+import functools
 from typing import Optional
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from config import load_agent_data, filter_data, get_model, load_prompts
+import numpy as np
+from config import load_agent_data, filter_data, year_slice, yearly_table, match_countries, parse_countries, get_model, load_prompts, reduce_col, reduce_cols, top_rows, to_json, TOOL_CACHE_SIZE
 
 df = load_agent_data("news_stats")
+_COLS = frozenset(df.columns)
+_EVENT_KINDS = ['total', 'war', 'protest', 'sanctions_coercion', 'humanitarian_aid', 'threat', 'diplomatic_tension']
+_SUM_COLS = [f'{k}_events' for k in _EVENT_KINDS if f'{k}_events' in _COLS] + ['total_mentions', 'severe_negative_events']
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_country_event_stats(country: str, year: Optional[int] = None) -> str:
     """Get news/event statistics for a country: events, war, protests, sanctions, tone, instability."""
     data = filter_data(df, country=country, year=year)
     if data.empty:
         return f"No GDELT data for '{country}'" + (f" in {year}" if year else "")
-    return json.dumps({
+    sums = {c: int(v or 0) for c, v in reduce_cols(data, _SUM_COLS, np.nansum).items()}
+    tone = reduce_cols(data, ['avg_goldstein_scale', 'avg_tone'], ndigits=3)
+    risk = reduce_cols(data, ['instability_index', 'conflict_ratio'], ndigits=4)
+    return to_json({
         "country": country,
         "period": str(year) if year else f"{int(data['year'].min())}-{int(data['year'].max())}",
         "months": len(data),
-        "events": {k: int(data[f'{k}_events'].sum()) if f'{k}_events' in data.columns else int(data.get(k, 0))
-                   for k in ['total', 'war', 'protest', 'sanctions_coercion', 'humanitarian_aid', 'threat', 'diplomatic_tension']
-                   if f'{k}_events' in data.columns or k == 'total'},
+        "events": {k: sums[f'{k}_events'] if f'{k}_events' in _COLS else int(data.get(k, 0))
+                   for k in _EVENT_KINDS if f'{k}_events' in _COLS or k == 'total'},
         "severity": {
-            "avg_goldstein": round(float(data['avg_goldstein_scale'].mean()), 3),
-            "avg_tone": round(float(data['avg_tone'].mean()), 3),
-            "total_mentions": int(data['total_mentions'].sum()),
-            "severe_events": int(data['severe_negative_events'].sum()),
+            "avg_goldstein": tone['avg_goldstein_scale'],
+            "avg_tone": tone['avg_tone'],
+            "total_mentions": sums['total_mentions'],
+            "severe_events": sums['severe_negative_events'],
         },
         "risk": {
-            "avg_instability": round(float(data['instability_index'].mean()), 4),
-            "max_instability": round(float(data['instability_index'].max()), 4),
-            "avg_conflict_ratio": round(float(data['conflict_ratio'].mean()), 4),
+            "avg_instability": risk['instability_index'],
+            "max_instability": reduce_col(data['instability_index'], np.nanmax, ndigits=4),
+            "avg_conflict_ratio": risk['conflict_ratio'],
         }
-    }, indent=2)
+    })
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def find_high_risk_periods(country: str, risk_type: str = "instability", top_n: int = 10) -> str:
     """Find most dangerous months. risk_type: 'instability','conflict','sanctions','humanitarian'"""
     data = filter_data(df, country=country)
     if data.empty: return f"No data for '{country}'"
     col = {"instability": "instability_index", "conflict": "war_events",
            "sanctions": "sanctions_coercion_events", "humanitarian": "humanitarian_aid_events"}.get(risk_type, "instability_index")
-    worst = data.nlargest(top_n, col)
-    return json.dumps({"country": country, "risk_type": risk_type,
+    worst = top_rows(data, col, top_n)
+    return to_json({"country": country, "risk_type": risk_type,
         "top_periods": worst[['year_month','year','month','war_events','protest_events',
             'sanctions_coercion_events','humanitarian_aid_events','instability_index',
-            'avg_goldstein_scale','avg_tone']].to_dict('records')}, indent=2)
+            'avg_goldstein_scale','avg_tone']].to_dict('records')})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def compare_countries_risk(countries: str, year: int) -> str:
     """Compare risk across countries. countries: comma-separated e.g. 'India,Pakistan,China'"""
+    names = parse_countries(countries)
+    agg = match_countries(df, names, year=year).groupby('_query', sort=False).agg(
+        total_events=('total_events','sum'), war_events=('war_events','sum'), protest_events=('protest_events','sum'),
+        sanctions=('sanctions_coercion_events','sum'), avg_instability=('instability_index','mean'),
+        avg_goldstein=('avg_goldstein_scale','mean')).to_dict('index')
     results = []
-    for c in [x.strip() for x in countries.split(',')]:
-        data = filter_data(df, country=c, year=year)
-        if data.empty: continue
-        results.append({"country": c, "total_events": int(data['total_events'].sum()),
-            "war_events": int(data['war_events'].sum()), "protest_events": int(data['protest_events'].sum()),
-            "sanctions": int(data['sanctions_coercion_events'].sum()),
-            "avg_instability": round(float(data['instability_index'].mean()), 4),
-            "avg_goldstein": round(float(data['avg_goldstein_scale'].mean()), 3)})
+    for c in names:
+        if c not in agg: continue
+        a = agg[c]
+        results.append({"country": c, "total_events": int(a['total_events']),
+            "war_events": int(a['war_events']), "protest_events": int(a['protest_events']),
+            "sanctions": int(a['sanctions']),
+            "avg_instability": round(float(a['avg_instability']), 4),
+            "avg_goldstein": round(float(a['avg_goldstein']), 3)})
     results.sort(key=lambda x: x['avg_instability'], reverse=True)
-    return json.dumps({"year": year, "comparison": results}, indent=2)
+    return to_json({"year": year, "comparison": results})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_risk_trend(country: str, year_start: int, year_end: int, metric: str = "instability_index") -> str:
     """Yearly trend of a risk metric."""
-    data = filter_data(df, country=country, year_start=year_start, year_end=year_end)
-    if data.empty: return f"No data for '{country}' {year_start}-{year_end}"
-    yearly = data.groupby('year').agg(value=(metric, 'mean')).reset_index()
+    yearly = yearly_table(df, country, year_start, year_end, value=(metric, 'mean'))
+    if yearly is None: return f"No data for '{country}' {year_start}-{year_end}"
     direction = "increasing" if yearly['value'].iloc[-1] > yearly['value'].iloc[0] else "decreasing"
-    return json.dumps({"country": country, "metric": metric, "trend": direction,
-                        "yearly": yearly.to_dict('records')}, indent=2)
+    return to_json({"country": country, "metric": metric, "trend": direction,
+                        "yearly": yearly.to_dict('records')})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def find_global_hotspots(year: int, metric: str = "instability_index", top_n: int = 15) -> str:
     """Top N most at-risk countries globally for a year."""
-    data = df[df['year'] == year]
+    data = year_slice(df, year)
     if data.empty: return f"No data for {year}"
     agg = 'mean' if metric in ['instability_index','conflict_ratio'] else 'sum'
-    h = data.groupby(['country_code','country_name']).agg(risk=(metric, agg), events=('total_events','sum')).reset_index()
+    h = data.groupby(['country_code','country_name'], observed=True).agg(risk=(metric, agg), events=('total_events','sum')).reset_index()
     h = h.dropna(subset=['country_name']).nlargest(top_n, 'risk')
-    return json.dumps({"year": year, "hotspots": h.to_dict('records')}, indent=2, default=str)
+    return to_json({"year": year, "hotspots": h.to_dict('records')})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def find_cascade_risk(trigger_country: str, year: int, top_n: int = 10) -> str:
     """Which countries are at risk if trigger_country has a crisis?"""
     trigger = filter_data(df, country=trigger_country, year=year)
@@ -96,14 +112,15 @@ def find_cascade_risk(trigger_country: str, year: int, top_n: int = 10) -> str:
     t_inst = float(trigger['instability_index'].mean())
     t_conf = float(trigger['conflict_ratio'].mean())
     t_hum = float(trigger['humanitarian_aid_events'].sum())
-    all_c = df[df['year'] == year].groupby(['country_code','country_name']).agg(
+    all_c = year_slice(df, year).groupby(['country_code','country_name'], observed=True).agg(
         instability=('instability_index','mean'), conflict=('conflict_ratio','mean'),
         humanitarian=('humanitarian_aid_events','sum'), wars=('war_events','sum')).reset_index().dropna(subset=['country_name'])
-    all_c['cascade_score'] = (0.4*(all_c['instability']/max(t_inst,0.001)).clip(0,3) +
-        0.3*(all_c['conflict']/max(t_conf,0.001)).clip(0,3) + 0.3*(all_c['humanitarian']/max(t_hum,1)).clip(0,3))
+    inst, conf, hum = all_c[['instability','conflict','humanitarian']].to_numpy(dtype='float64').T
+    all_c['cascade_score'] = (0.4*np.clip(inst/max(t_inst,0.001), 0, 3) +
+        0.3*np.clip(conf/max(t_conf,0.001), 0, 3) + 0.3*np.clip(hum/max(t_hum,1), 0, 3))
     cascade = all_c[~all_c['country_name'].str.contains(trigger_country, case=False, na=False)].nlargest(top_n, 'cascade_score')
-    return json.dumps({"trigger": trigger_country, "year": year,
-        "at_risk": cascade[['country_name','instability','humanitarian','cascade_score']].to_dict('records')}, indent=2, default=str)
+    return to_json({"trigger": trigger_country, "year": year,
+        "at_risk": cascade[['country_name','instability','humanitarian','cascade_score']].to_dict('records')})
 
 
 ALL_TOOLS = [get_country_event_stats, find_high_risk_periods, compare_countries_risk,
@@ -1,57 +1,70 @@
 """Political Agent — Political stability from GDELT subset"""
 
-import json
+import functools
 from typing import Optional
 from langchain_core.tools import tool
 from langgraph.prebuilt import create_react_agent
-from config import load_agent_data, filter_data, get_model, load_prompts
+import numpy as np
+from config import load_agent_data, filter_data, yearly_table, match_countries, parse_countries, reduce_cols, get_model, load_prompts, to_json, TOOL_CACHE_SIZE
 
-df = load_agent_data("political")
+
+@functools.cache
+def _df():
+    """The political frame, loaded on the first tool call instead of at import."""
+    return load_agent_data("political")
+
+
+# get_political_stability: output key -> summed column, and the averaged index columns
+_EVENT_SUMS = {"protests": 'protest_events', "sanctions": 'sanctions_coercion_events', "threats": 'threat_events',
+               "diplomatic_tensions": 'diplomatic_tension_events', "force_posture": 'force_posture_events'}
+_INDEX_MEANS = ('instability_index', 'conflict_ratio', 'political_tension_score', 'cooperation_vs_conflict')
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_political_stability(country: str, year: Optional[int] = None) -> str:
     """Get political stability metrics: protests, sanctions, threats, cooperation ratio, tension score."""
-    data = filter_data(df, country=country, year=year)
+    data = filter_data(_df(), country=country, year=year)
     if data.empty: return f"No political data for '{country}'" + (f" in {year}" if year else "")
-    return json.dumps({"country": country,
+    sums = reduce_cols(data, list(_EVENT_SUMS.values()), np.nansum)
+    indices = reduce_cols(data, [c for c in _INDEX_MEANS if c in data.columns], ndigits=4)
+    tone = reduce_cols(data, ['avg_goldstein_scale', 'avg_tone'], ndigits=3)
+    return to_json({"country": country,
         "period": str(year) if year else f"{int(data['year'].min())}-{int(data['year'].max())}",
-        "events": {"protests": int(data['protest_events'].sum()), "sanctions": int(data['sanctions_coercion_events'].sum()),
-            "threats": int(data['threat_events'].sum()), "diplomatic_tensions": int(data['diplomatic_tension_events'].sum()),
-            "force_posture": int(data['force_posture_events'].sum())},
-        "indices": {"instability": round(float(data['instability_index'].mean()),4),
-            "conflict_ratio": round(float(data['conflict_ratio'].mean()),4),
-            "political_tension": round(float(data['political_tension_score'].mean()),4) if 'political_tension_score' in data.columns else None,
-            "cooperation_vs_conflict": round(float(data['cooperation_vs_conflict'].mean()),4) if 'cooperation_vs_conflict' in data.columns else None,
-            "goldstein": round(float(data['avg_goldstein_scale'].mean()),3),
-            "tone": round(float(data['avg_tone'].mean()),3)}
-    }, indent=2)
+        "events": {key: int(sums[col] or 0) for key, col in _EVENT_SUMS.items()},
+        "indices": {"instability": indices['instability_index'],
+            "conflict_ratio": indices['conflict_ratio'],
+            "political_tension": indices.get('political_tension_score'),
+            "cooperation_vs_conflict": indices.get('cooperation_vs_conflict'),
+            "goldstein": tone['avg_goldstein_scale'],
+            "tone": tone['avg_tone']}
+    })
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def compare_political_stability(countries: str, year: int) -> str:
     """Compare political stability across countries."""
-    results = []
-    for c in [x.strip() for x in countries.split(',')]:
-        data = filter_data(df, country=c, year=year)
-        if data.empty: continue
-        results.append({"country": c, "protests": int(data['protest_events'].sum()),
-            "sanctions": int(data['sanctions_coercion_events'].sum()),
-            "instability": round(float(data['instability_index'].mean()),4),
-            "goldstein": round(float(data['avg_goldstein_scale'].mean()),3)})
+    names = parse_countries(countries)
+    agg = match_countries(_df(), names, year=year).groupby('_query', sort=False).agg(
+        protests=('protest_events','sum'), sanctions=('sanctions_coercion_events','sum'),
+        instability=('instability_index','mean'), goldstein=('avg_goldstein_scale','mean')).to_dict('index')
+    results = [{"country": c, "protests": int(agg[c]['protests']), "sanctions": int(agg[c]['sanctions']),
+                "instability": round(float(agg[c]['instability']),4), "goldstein": round(float(agg[c]['goldstein']),3)}
+               for c in names if c in agg]
     results.sort(key=lambda x: x['instability'], reverse=True)
-    return json.dumps({"year": year, "comparison": results}, indent=2)
+    return to_json({"year": year, "comparison": results})
 
 
 @tool
+@functools.lru_cache(maxsize=TOOL_CACHE_SIZE)
 def get_political_trend(country: str, year_start: int, year_end: int) -> str:
     """Political stability trend over time."""
-    data = filter_data(df, country=country, year_start=year_start, year_end=year_end)
-    if data.empty: return f"No data for '{country}' {year_start}-{year_end}"
-    yearly = data.groupby('year').agg(instability=('instability_index','mean'),
-        protests=('protest_events','sum'), sanctions=('sanctions_coercion_events','sum')).reset_index()
+    yearly = yearly_table(_df(), country, year_start, year_end, instability=('instability_index','mean'),
+        protests=('protest_events','sum'), sanctions=('sanctions_coercion_events','sum'))
+    if yearly is None: return f"No data for '{country}' {year_start}-{year_end}"
     direction = "destabilizing" if yearly['instability'].iloc[-1] > yearly['instability'].iloc[0] else "stabilizing"
-    return json.dumps({"country": country, "trend": direction, "yearly": yearly.to_dict('records')}, indent=2)
+    return to_json({"country": country, "trend": direction, "yearly": yearly.to_dict('records')})
 
 
 ALL_TOOLS = [get_political_stability, compare_political_stability, get_political_trend]
@@ -2,13 +2,20 @@
 ResilienceAI — Shared Config
 """
 
+import functools
 import logging
 import os
+import pickle
+import re
 
 logger = logging.getLogger(__name__)
 import yaml
+import numpy as np
+import orjson
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -60,11 +67,38 @@ DATA_FILES = {
     "health": os.path.join(DATA_DIR, "agent_health.csv"),
 }
 
+# Columns the agent tools read; the rest of these wide CSVs is dropped at load so every
+# filter/groupby moves fewer bytes. Agents not listed keep all columns. Names missing
+# from a CSV are ignored (the tools also accept 'Country'/'Year'/'disaster_type').
+# weather keeps all columns: get_weather_trend(metric=...) can trend any of its numeric columns.
+DATA_COLUMNS = {
+    "disaster": ("year", "Year", "country_name", "Country", "iso3", "country_code",
+                 "Disaster Type", "disaster_type", "Total Events", "Total Affected", "Total Deaths",
+                 "Total Damage (USD, adjusted)"),
+    "political": ("country_code", "country_name", "iso3", "year", "month",
+                  "protest_events", "sanctions_coercion_events", "threat_events", "diplomatic_tension_events",
+                  "force_posture_events", "avg_goldstein_scale", "avg_tone", "instability_index",
+                  "conflict_ratio", "political_tension_score", "cooperation_vs_conflict"),
+}
+
 
 # ============================================================
 # MODEL — Remote Blackwell (OpenAI-compatible /v1/chat/completions)
 # ============================================================
 
+# One pooled, keep-alive session for every LLM call: skips the TCP (and TLS) handshake per turn.
+# Retries only cover connection failures; a POST that reached the server is not resent.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.2))
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+
+def _est_tokens(text):
+    """Rough token count (~4 chars per token) used to fit the 8192-token context."""
+    return max(1, (len(text or "") // 4))
+
+
 class RemoteBlackwellChatModel(BaseChatModel):
     """LangChain-compatible chat model calling remote Blackwell endpoint (OpenAI-style /v1/chat/completions)."""
     url: str = ""
@@ -94,85 +128,74 @@ class RemoteBlackwellChatModel(BaseChatModel):
         # What the model receives (input): prompt (system + first user) + conversation (user/assistant turns).
         # Assistant turns can be long: they include agent tool outputs (e.g. JSON/summaries from CSV data).
         # The CSV files on disk are read by agent tools; the tools return text; that text is what ends up in the conversation, not the raw CSV.
-        # Blackwell API requires alternating user/assistant only (no system). Merge system into first user; then collapse consecutive same-role.
+        # Blackwell API requires alternating user/assistant only (no system). Merge system into first user and
+        # collapse consecutive same-role turns as they arrive; each run keeps its parts and is joined once.
         system_parts = []
-        raw = []
+        runs = []  # [role, [content, ...]]
         for m in messages:
             if isinstance(m, dict):
                 role = (m.get("role") or "user").lower()
                 if role not in ("system", "user", "assistant"):
                     role = "user"
-                if role == "system":
-                    system_parts.append(_content(m))
-                else:
-                    raw.append({"role": role, "content": _content(m)})
             elif isinstance(m, SystemMessage):
-                system_parts.append(_content(m))
+                role = "system"
             elif isinstance(m, HumanMessage):
-                raw.append({"role": "user", "content": _content(m)})
+                role = "user"
             elif isinstance(m, AIMessage):
-                raw.append({"role": "assistant", "content": _content(m)})
+                role = "assistant"
+            else:
+                continue
+            if role == "system":
+                system_parts.append(_content(m))
+            elif runs and runs[-1][0] == role:
+                runs[-1][1].append(_content(m))
+            else:
+                runs.append([role, [_content(m)]])
 
         if system_parts:
             prefix = "System instruction: " + "\n".join(system_parts).strip() + "\n\n"
-            if raw and raw[0]["role"] == "user":
-                raw[0]["content"] = prefix + (raw[0].get("content") or "")
-            else:
-                raw.insert(0, {"role": "user", "content": prefix.strip()})
-
-        # Collapse consecutive same-role messages so we get strict user/assistant alternation
-        api_messages = []
-        for m in raw:
-            if api_messages and api_messages[-1]["role"] == m["role"]:
-                api_messages[-1]["content"] = (api_messages[-1].get("content") or "") + "\n\n" + (m.get("content") or "")
+            if runs and runs[0][0] == "user":
+                runs[0][1][0] = prefix + runs[0][1][0]
             else:
-                api_messages.append({"role": m["role"], "content": m.get("content") or ""})
+                runs.insert(0, ["user", [prefix.strip()]])
 
         # Must start with user; if only assistant(s), prepend a user turn
-        if api_messages and api_messages[0]["role"] != "user":
-            api_messages.insert(0, {"role": "user", "content": "Continue."})
-
-        def _est_tokens(text):
-            return max(1, (len(text or "") // 4))
+        if runs and runs[0][0] != "user":
+            runs.insert(0, ["user", ["Continue."]])
+        api_messages = [{"role": role, "content": parts[0] if len(parts) == 1 else "\n\n".join(parts)} for role, parts in runs]
 
         # Model context is 8192. Input = prompt (system+first user) + conversation (user/assistant turns; assistant turns can contain long CSV-derived tool output). Trim if over limit.
         max_input_tokens = 8192 - 1024
-        total_tokens = sum(_est_tokens(m.get("content")) for m in api_messages)
+        total_tokens = sum(_est_tokens(m["content"]) for m in api_messages)
         if total_tokens > max_input_tokens:
             # Keep first message (system + first user); cap its size. Then keep last N messages to fit.
             first = api_messages[0]
-            first_content = (first.get("content") or "")[:24000]
-            first_tokens = _est_tokens(first_content)
-            rest = api_messages[1:]
-            trimmed_rest = []
-            remaining = max_input_tokens - first_tokens
-            for m in reversed(rest):
-                content = (m.get("content") or "")[: (remaining * 4)]
+            first_content = (first["content"] or "")[:24000]
+            remaining = max_input_tokens - _est_tokens(first_content)
+            kept = []
+            for m in reversed(api_messages[1:]):
+                content = (m["content"] or "")[: (remaining * 4)]
                 t = _est_tokens(content)
                 if t > remaining:
                     break
-                trimmed_rest.append({"role": m["role"], "content": content})
+                kept.append({"role": m["role"], "content": content})
                 remaining -= t
-            api_messages = [{"role": first["role"], "content": first_content}] + list(reversed(trimmed_rest))
-            # Re-enforce alternation after trim (trimmed list can have consecutive same role)
-            collapsed = []
-            for m in api_messages:
-                if collapsed and collapsed[-1]["role"] == m["role"]:
-                    collapsed[-1]["content"] = (collapsed[-1].get("content") or "") + "\n\n" + (m.get("content") or "")
-                else:
-                    collapsed.append({"role": m["role"], "content": m.get("content") or ""})
-            if collapsed and collapsed[0]["role"] != "user":
-                collapsed.insert(0, {"role": "user", "content": "Continue."})
-            api_messages = collapsed
+            kept.reverse()
+            # The kept tail still alternates, so only its seam with the first (user) turn can repeat a role
+            if kept and kept[0]["role"] == first["role"]:
+                first_content += "\n\n" + kept.pop(0)["content"]
+            api_messages = [{"role": first["role"], "content": first_content}] + kept
+            # Merged turns re-estimate as a whole (joined text rounds differently than its parts)
+            total_tokens = sum(_est_tokens(m["content"]) for m in api_messages)
 
         # max_tokens must fit in 8192 context: set to remaining room
-        input_tokens = sum(_est_tokens(m.get("content")) for m in api_messages)
+        input_tokens = total_tokens
         max_output = max(256, 8192 - input_tokens - 50)
         max_tokens = min(1024, max_output)
 
         _log_llm_input("RemoteBlackwell", self.model_name, api_messages, system_chars=0)
 
-        headers = {"Content-Type": "application/json"}
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
         payload = {
             "model": self.model_name,
             "messages": api_messages,
@@ -180,9 +203,9 @@ class RemoteBlackwellChatModel(BaseChatModel):
             "temperature": 0.7,
         }
         try:
-            resp = requests.post(self.url, headers=headers, json=payload, timeout=120)
+            resp = _SESSION.post(self.url, headers=headers, data=orjson.dumps(payload), timeout=120)
             resp.raise_for_status()
-            data = resp.json()
+            data = orjson.loads(resp.content)
             choices = data.get("choices") or []
             if not choices:
                 return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Error: No choices in response."))])
@@ -202,17 +225,25 @@ class RemoteBlackwellChatModel(BaseChatModel):
         return self
 
 
-def get_model():
-    """Use Remote Blackwell only (OpenAI-style /v1/chat/completions)."""
+@functools.lru_cache(maxsize=None)
+def get_model(role: Optional[str] = None):
+    """Use Remote Blackwell only (OpenAI-style /v1/chat/completions).
+    role="router" (the supervisor) uses REMOTE_BLACKWELL_ROUTER_URL / REMOTE_BLACKWELL_ROUTER_MODEL
+    when set, so routing can run on a smaller model; otherwise it shares the agents' model."""
     url = os.getenv("REMOTE_BLACKWELL_URL", "http://129.10.224.226:8000/v1/chat/completions").strip()
     model = os.getenv("REMOTE_BLACKWELL_MODEL", "google/gemma-3-12b-it").strip()
+    if role == "router":
+        url = os.getenv("REMOTE_BLACKWELL_ROUTER_URL", "").strip() or url
+        model = os.getenv("REMOTE_BLACKWELL_ROUTER_MODEL", "").strip() or model
     return RemoteBlackwellChatModel(url=url, model=model or "google/gemma-3-12b-it")
 
 # ============================================================
 # PROMPTS
 # ============================================================
 
+@functools.lru_cache(maxsize=1)
 def load_prompts():
+    """Parse prompts.yaml once per process; callers share the returned dict (read-only)."""
     prompts_path = os.path.join(os.path.dirname(__file__), "prompts.yaml")
     with open(prompts_path, 'r') as f:
         return yaml.safe_load(f)
@@ -223,21 +254,84 @@ def load_prompts():
 # ============================================================
 
 _data_cache = {}
+# id(df) -> (df, {column: {value: sorted row positions}}, {(column, pattern): matched positions}),
+# both filled lazily
+_row_index = {}
+_MAX_NAME_MATCHES = 4096
+# (id(df), country, code_col, year_col, aggs) -> per-year aggregate table (or None: no rows)
+_yearly_tables = {}
+# Parsed + typed frames pickled next to the CSVs; rebuilt whenever the CSV changes.
+# Bump _PICKLE_FORMAT when _read_agent_csv() changes what it produces.
+_PICKLE_DIR = os.path.join(DATA_DIR, ".cache")
+_PICKLE_FORMAT = 2
+
+
+def _read_agent_csv(path: str, columns=None) -> pd.DataFrame:
+    """Parse an agent CSV (only `columns`, when given) and normalise its dtypes."""
+    df = pd.read_csv(path, usecols=(lambda col: col in columns) if columns else None, low_memory=False)
+    # Standardize year columns
+    for col in ['year', 'Year']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in ['month']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # int64 counts -> int32 when even the column's total fits, so no groupby sum
+    # (which keeps the input dtype) can overflow. Floats stay float64: pandas
+    # reduces float32 in float32, which would change the reported totals.
+    for col in df.select_dtypes(include='int64').columns:
+        if df[col].abs().sum() <= np.iinfo(np.int32).max:
+            df[col] = df[col].astype('int32')
+    # Country ids repeat on every row: store them as int-coded categoricals
+    for col in ['country_name', 'iso3', 'country_code']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    # Likewise the EM-DAT labels the disaster tools match and group on, when few enough
+    for col in ['Country', 'Disaster Group', 'Disaster Subroup', 'Disaster Type', 'Disaster Subtype', 'disaster_type']:
+        if col in df.columns and df[col].nunique() < 0.05 * len(df):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _read_agent_frame(agent_name: str, path: str) -> pd.DataFrame:
+    """_read_agent_csv() behind an on-disk pickle keyed by the CSV's mtime and size,
+    the kept columns, the cache format and the pandas version that wrote it."""
+    stat = os.stat(path)
+    columns = DATA_COLUMNS.get(agent_name)
+    source = (stat.st_mtime_ns, stat.st_size, columns, _PICKLE_FORMAT, pd.__version__)
+    cache_path = os.path.join(_PICKLE_DIR, f"{agent_name}.pkl")
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get("source") == source:
+            return cached["df"]
+    except Exception:
+        pass
+    df = _read_agent_csv(path, columns)
+    try:
+        os.makedirs(_PICKLE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"source": source, "df": df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write data cache %s: %s", cache_path, e)
+    return df
+
+
+# Tool results are pure functions of their arguments over these static frames, so agent
+# modules memoize them with functools.lru_cache(maxsize=TOOL_CACHE_SIZE).
+TOOL_CACHE_SIZE = 4096
+
 
 def load_agent_data(agent_name: str) -> pd.DataFrame:
     """Load CSV for an agent with caching."""
     if agent_name not in _data_cache:
         path = DATA_FILES.get(agent_name)
         if path and os.path.exists(path):
-            df = pd.read_csv(path, low_memory=False)
-            # Standardize year columns
-            for col in ['year', 'Year']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            for col in ['month']:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
+            df = _read_agent_frame(agent_name, path)
             _data_cache[agent_name] = df
+            _row_index[id(df)] = (df, {}, {})
             print(f"  Loaded {agent_name}: {df.shape}")
         else:
             print(f"  ⚠ Data not found for {agent_name}: {path}")
@@ -249,10 +343,54 @@ def load_agent_data(agent_name: str) -> pd.DataFrame:
 # SHARED FILTER HELPER
 # ============================================================
 
-def filter_data(df, country=None, year=None, year_start=None, year_end=None,
-                country_col='country_name', code_col='country_code', year_col='year'):
-    """Universal filter for any agent dataframe."""
-    result = df.copy()
+def _is_indexed(df):
+    entry = _row_index.get(id(df))
+    return entry is not None and entry[0] is df
+
+
+def _positions(df, col):
+    """{value: sorted row positions} for one column of a loaded frame, built on first use."""
+    columns = _row_index[id(df)][1]
+    if col not in columns:
+        columns[col] = df.groupby(col, sort=False, observed=True).indices
+    return columns[col]
+
+
+_REGEX_META = frozenset('.^$*+?{}[]\\|()')
+
+
+@functools.lru_cache(maxsize=1024)
+def _name_matcher(country):
+    """Case-insensitive match test for a country query. Plain ASCII queries (nearly all of
+    them) are a lowercase substring check; anything with regex syntax is compiled once, and an
+    invalid pattern is matched literally instead of raising."""
+    if country.isascii() and _REGEX_META.isdisjoint(country):
+        needle = country.lower()
+        return lambda name: needle in name.lower()
+    try:
+        return re.compile(country, re.IGNORECASE).search
+    except re.error:
+        return re.compile(re.escape(country), re.IGNORECASE).search
+
+
+def _name_positions(df, col, country):
+    """Sorted row positions whose `col` matches the country pattern (regex, case-insensitive),
+    resolved over the unique names once per pattern and memoized."""
+    matches = _row_index[id(df)][2]
+    key = (col, country)
+    if key not in matches:
+        if len(matches) >= _MAX_NAME_MATCHES:
+            matches.clear()
+        matcher = _name_matcher(country)
+        hits = [pos for name, pos in _positions(df, col).items()
+                if isinstance(name, str) and matcher(name)]
+        matches[key] = np.sort(np.concatenate(hits)) if hits else np.empty(0, dtype=np.intp)
+    return matches[key]
+
+
+def _scan_filter(df, country, year, year_start, year_end, country_col, code_col, year_col):
+    """Boolean-mask filter, for frames that were not loaded through load_agent_data."""
+    result = df
     if country:
         name_match = result[result[country_col].str.contains(country, case=False, na=False)] if country_col in result.columns else pd.DataFrame()
         code_match = result[result[code_col] == country.upper()] if code_col in result.columns else pd.DataFrame()
@@ -261,4 +399,182 @@ def filter_data(df, country=None, year=None, year_start=None, year_end=None,
         result = result[result[year_col] == int(year)]
     if year_start and year_end:
         result = result[(result[year_col] >= int(year_start)) & (result[year_col] <= int(year_end))]
-    return result
\ No newline at end of file
+    return result
+
+
+def filter_data(df, country=None, year=None, year_start=None, year_end=None,
+                country_col='country_name', code_col='country_code', year_col='year'):
+    """Universal filter for any agent dataframe.
+
+    Loaded frames are filtered through per-column row-position indexes: the
+    country pattern is matched against the unique names once (then memoized), year
+    and year ranges are dict lookups, and the surviving positions are gathered
+    with a single take(), so each call costs O(matching rows) instead of a
+    full-frame scan. Nothing is copied: with no filter the frame itself comes
+    back, so callers must treat the result as read-only.
+    """
+    if not _is_indexed(df):
+        return _scan_filter(df, country, year, year_start, year_end, country_col, code_col, year_col)
+    empty = np.empty(0, dtype=np.intp)
+    rows = None
+    if country:
+        rows = _name_positions(df, country_col, country) if country_col in df.columns else empty
+        if not rows.size:
+            if code_col not in df.columns:
+                return _scan_filter(pd.DataFrame(), None, year, year_start, year_end, country_col, code_col, year_col)
+            rows = _positions(df, code_col).get(country.upper(), empty)
+            if not rows.size:
+                # Unknown country (often a hallucinated name): skip the year lookups
+                return df.iloc[0:0]
+    if year:
+        year_rows = _positions(df, year_col).get(int(year), empty)
+        rows = year_rows if rows is None else np.intersect1d(rows, year_rows, assume_unique=True)
+    if year_start and year_end:
+        lo, hi = int(year_start), int(year_end)
+        spans = [pos for y, pos in _positions(df, year_col).items() if lo <= y <= hi]
+        span_rows = np.sort(np.concatenate(spans)) if spans else empty
+        rows = span_rows if rows is None else np.intersect1d(rows, span_rows, assume_unique=True)
+    if rows is None:
+        return df
+    # An empty slice is much cheaper than take() with no positions
+    return df.take(rows) if rows.size else df.iloc[0:0]
+
+
+def name_rows(df, country, country_col='country_name', year=None, year_col='year'):
+    """Rows whose country_col matches country like filter_data()'s name match, without the code
+    fallback; with year, only that year's (intersected on the position index for loaded frames)."""
+    if not _is_indexed(df):
+        data = df[df[country_col].str.contains(country, case=False, na=False)]
+        return data if year is None else data[data[year_col] == year]
+    rows = _name_positions(df, country_col, country)
+    if year is not None:
+        rows = np.intersect1d(rows, _positions(df, year_col).get(year, np.empty(0, dtype=np.intp)), assume_unique=True)
+    return df.take(rows) if rows.size else df.iloc[0:0]
+
+
+def year_slice(df, year, year_col='year'):
+    """df[df[year_col] == year], answered from the position index for loaded frames."""
+    if not _is_indexed(df):
+        return df[df[year_col] == year]
+    return df.take(_positions(df, year_col).get(year, np.empty(0, dtype=np.intp)))
+
+
+def yearly_table(df, country, year_start, year_end, code_col='country_code', year_col='year', **aggs):
+    """filter_data(df, country, year_start=..., year_end=...).groupby(year_col).agg(**aggs).reset_index(),
+    or None when no rows match.
+
+    Each year's aggregate only depends on that year's rows, so for loaded frames the table
+    over all of a country's years is built once and trend queries slice it by range.
+    """
+    indexed = _is_indexed(df)
+    key = (id(df), country, code_col, year_col, tuple(aggs.items()))
+    if indexed and key in _yearly_tables:
+        table = _yearly_tables[key]
+    else:
+        rows = filter_data(df, country=country, code_col=code_col, year_col=year_col)
+        table = None if rows.empty else rows.groupby(year_col).agg(**aggs)
+        if indexed:
+            if len(_yearly_tables) >= _MAX_NAME_MATCHES:
+                _yearly_tables.clear()
+            _yearly_tables[key] = table
+    if table is None:
+        return None
+    if year_start and year_end:
+        table = table.loc[int(year_start):int(year_end)]
+        if table.empty:
+            return None
+    return table.reset_index()
+
+
+def parse_countries(countries):
+    """Split a comma-separated tool argument into unique, non-empty names, keeping input order."""
+    return list(dict.fromkeys(filter(None, (x.strip() for x in countries.split(',')))))
+
+
+def match_countries(df, countries, year=None, country_col='country_name', code_col='country_code', year_col='year'):
+    """Rows of df for several countries at once, tagged with the requested name in '_query'.
+
+    Each request is matched the way filter_data() matches a single country (name
+    substring, case-insensitive; exact code as a fallback), but resolved against
+    the unique names and applied with one join, so compare_* tools can aggregate
+    every country with a single groupby. A row matching several requests (e.g.
+    "Niger" and "Nigeria") appears once per request.
+    """
+    names = df[country_col].dropna().unique() if country_col in df.columns else []
+    lowered = [(name, str(name).lower()) for name in names]
+    name_pairs, code_pairs = [], []
+    for query in countries:
+        hits = [name for name, low in lowered if query.lower() in low]
+        if hits:
+            name_pairs.extend((name, query) for name in hits)
+        elif code_col in df.columns:
+            code_pairs.append((query.upper(), query))
+    rows = year_slice(df, int(year), year_col) if year else df
+    parts = [rows.merge(pd.DataFrame(pairs, columns=[col, '_query']), on=col)
+             for col, pairs in ((country_col, name_pairs), (code_col, code_pairs)) if pairs]
+    if not parts:
+        return rows.iloc[0:0].assign(_query=pd.Series(dtype=object))
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+# ============================================================
+# SHARED REDUCTION HELPER
+# ============================================================
+
+def reduce_col(series, fn=np.nanmean, ndigits=None):
+    """NaN-aware reduction straight on the column's ndarray (skips pandas dispatch).
+
+    Returns None when the column is empty or entirely NaN, mirroring the tools'
+    `... if data[col].notna().any() else None` guards.
+    """
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    if values.size == 0 or np.isnan(values).all():
+        return None
+    result = float(fn(values))
+    return round(result, ndigits) if ndigits is not None else result
+
+
+def reduce_int(series, fn=np.nansum):
+    """reduce_col() for count columns: the result as an int, or None when all-NaN."""
+    result = reduce_col(series, fn)
+    return None if result is None else int(result)
+
+
+def top_rows(frame, col, n):
+    """frame.nlargest(n, col), selecting the candidates with np.argpartition in O(N)
+    and sorting only those. Same result, including pandas' tie order (row order) and
+    its NaN handling (NaN rows only pad out a short result)."""
+    if n <= 0 or n >= len(frame):
+        return frame.nlargest(n, col)
+    values = frame[col].to_numpy(dtype="float64", na_value=np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if valid.size > n:
+        kth = values[valid[np.argpartition(-values[valid], n - 1)[:n]]].min()
+        valid = valid[values[valid] >= kth]
+    rows = valid[np.argsort(-values[valid], kind="stable")][:n]
+    if rows.size < n:
+        rows = np.concatenate([rows, np.flatnonzero(np.isnan(values))])[:n]
+    return frame.take(rows)
+
+
+def reduce_cols(frame, cols, fn=np.nanmean, ndigits=None):
+    """reduce_col() over several columns in one 2-D pass: {col: value or None}."""
+    if not len(frame):
+        return dict.fromkeys(cols)
+    # one contiguous row per column, so each reduction sums in the same order as reduce_col
+    values = np.ascontiguousarray(frame[list(cols)].to_numpy(dtype="float64", na_value=np.nan).T)
+    seen = ~np.isnan(values).all(axis=1)
+    results = fn(np.where(seen[:, None], values, 0.0), axis=1)
+    return {col: (round(float(v), ndigits) if ndigits is not None else float(v)) if ok else None
+            for col, v, ok in zip(cols, results, seen)}
+
+
+# ============================================================
+# SHARED JSON HELPER
+# ============================================================
+
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def to_json(obj) -> str:
+    """Serialize a tool result: 2-space indent, numpy scalars/arrays native, anything else via str()."""
+    return orjson.dumps(obj, default=str, option=_JSON_OPTIONS).decode()
@@ -4,37 +4,44 @@ ResilienceAI — Supervisor / Orchestrator Logic
 import logging
 import operator
 import json
+import re
 from typing import Annotated, Any, Dict, List, Optional, Sequence, TypedDict, Union
 
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, FunctionMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, FunctionMessage, convert_to_messages
 
 logger = logging.getLogger(__name__)
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from langchain_core.language_models.chat_models import BaseChatModel
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
+
+from message_utils import message_content, message_role
+
+# Max routing decisions memoized per supervisor (cleared when full)
+ROUTE_CACHE_SIZE = 4096
 
 # The agent state is the list of messages
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
-    next: str
+    # One agent (or FINISH), or several agents to run in parallel for a multi-topic query
+    next: Union[str, List[str]]
+    # The agents of the last fan-out, whose replies the aggregator merges
+    fanout: List[str]
 
-def _message_content(msg: Any) -> Optional[str]:
-    """Get content from message (object or dict)."""
-    if isinstance(msg, dict):
-        return msg.get("content") or msg.get("text") or ""
-    return getattr(msg, "content", None) or getattr(msg, "text", None)
+def _route_candidates(options: List[str]) -> List[tuple]:
+    """(agent name, lowercased) pairs, longer names first so "economic_news_agent" matches before "news_stats_agent"."""
+    agents_only = [o for o in options if o != "FINISH"]
+    return [(o, o.lower()) for o in sorted(agents_only, key=len, reverse=True)]
 
 
-def _parse_route_from_text(content: str, options: List[str]) -> Optional[str]:
-    """Find first agent name or FINISH in model text (tools may not be used by HF/DeepSeek)."""
+def _parse_route_from_text(content: str, options: List[str], candidates: Optional[List[tuple]] = None) -> Optional[str]:
+    """Find first agent name or FINISH in model text (tools may not be used by HF/DeepSeek).
+    Pass _route_candidates(options) when parsing many replies against the same options."""
     if not content or not options:
         return None
     text = content.strip().lower()
-    # Check longer agent names first so "economic_news_agent" matches before "news_stats_agent"
-    agents_only = [o for o in options if o != "FINISH"]
-    agents_sorted = sorted(agents_only, key=len, reverse=True)
-    for opt in agents_sorted:
-        if opt.lower() in text:
+    for opt, opt_lower in (candidates if candidates is not None else _route_candidates(options)):
+        if opt_lower in text:
             return opt
     if "finish" in text:
         return "FINISH"
@@ -43,12 +50,13 @@ def _parse_route_from_text(content: str, options: List[str]) -> Optional[str]:
 
 def parse_route_factory(options: List[str]):
     """Build parse_route that knows valid next steps (for text-based routing when tools are not used)."""
+    candidates = _route_candidates(options)
 
     def parse_route(message: BaseMessage) -> Dict[str, Any]:
         """Parse the route from the message: tool_calls, function_call, or text containing agent name."""
         if isinstance(message, dict):
-            content = _message_content(message) or ""
-            next_ = _parse_route_from_text(content, options)
+            content = message_content(message)
+            next_ = _parse_route_from_text(content, options, candidates)
             if next_:
                 return {"next": next_}
             return {"next": "FINISH"}
@@ -56,8 +64,8 @@ def parse_route_factory(options: List[str]):
             return message.tool_calls[0]["args"]
         if hasattr(message, "additional_kwargs") and getattr(message, "additional_kwargs") and "function_call" in message.additional_kwargs:
             return json.loads(message.additional_kwargs["function_call"]["arguments"])
-        content = _message_content(message) or ""
-        next_ = _parse_route_from_text(content, options)
+        content = message_content(message)
+        next_ = _parse_route_from_text(content, options, candidates)
         if next_:
             return {"next": next_}
         # No clear route in text: default FINISH (was previous behavior)
@@ -90,21 +98,20 @@ def create_supervisor(agents: List[Any], model: BaseChatModel, prompt: str):
         },
     }
     
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", prompt),
-            MessagesPlaceholder(variable_name="messages"),
-            (
-                "system",
-                "Given the conversation above, who should act next? Reply with ONLY one word from this list: {options}. "
-                "No explanation, no other text. Examples: food_agent, economy_agent, FINISH.",
-            ),
-        ]
-    ).partial(options=str(options), members=", ".join(members))
+    # Only the conversation varies between calls: build both system messages once instead of
+    # rendering a prompt template on every routing call
+    system_message = SystemMessage(content=prompt)
+    route_instruction = SystemMessage(
+        content=f"Given the conversation above, who should act next? Reply with ONLY one word from this list: {options}. "
+        "No explanation, no other text. Examples: food_agent, economy_agent, FINISH."
+    )
+
+    def supervisor_input(state: Dict[str, Any]) -> List[BaseMessage]:
+        return [system_message, *convert_to_messages(state["messages"]), route_instruction]
 
     parse_route = parse_route_factory(options)
     supervisor_chain = (
-        prompt_template
+        RunnableLambda(supervisor_input)
         | model.bind_tools(tools=[function_def])
         | parse_route
     )
@@ -155,54 +162,109 @@ def create_supervisor(agents: List[Any], model: BaseChatModel, prompt: str):
         ]),
     ]
 
-    def _infer_route_from_query(q: str) -> Optional[str]:
-        """Infer agent from user query using ordered keyword rules (most specific first)."""
-        if not q or not q.strip():
-            return None
-        text = (q or "").lower().strip()
-        for agent_name, keywords in QUERY_ROUTE_RULES:
-            if agent_name not in members:
-                continue
+    # All keywords in one compiled scan instead of a substring test per keyword. The lookahead
+    # reports every position's first matching alternative, and alternatives are in rule order,
+    # so the best rule hit anywhere in the text is among the matches.
+    keyword_agent: Dict[str, str] = {}
+    for agent_name, keywords in QUERY_ROUTE_RULES:
+        if agent_name in members:
             for k in keywords:
-                if k in text:
-                    return agent_name
-        return None
+                keyword_agent.setdefault(k, agent_name)
+    rule_rank = {agent_name: i for i, (agent_name, _) in enumerate(QUERY_ROUTE_RULES)}
+    keyword_scan = re.compile("(?=(" + "|".join(map(re.escape, keyword_agent)) + "))") if keyword_agent else None
 
-    def _last_message_role(messages: list) -> Optional[str]:
-        """Return role of last message: 'user', 'assistant', or None."""
-        if not messages:
-            return None
-        m = messages[-1]
-        if isinstance(m, dict):
-            return (m.get("role") or "").lower() or None
-        return (getattr(m, "type", "") or getattr(m, "role", "") or "").lower() or None
+    def _infer_routes_from_query(q: str) -> List[str]:
+        """Infer agents from user query using ordered keyword rules, most specific first.
+
+        The first agent is the best rule hit anywhere in the query. Overlapping hits are one
+        topic won by the earlier rule ("food trade" is food, not also economy), and further
+        topics only add their agent when they start a word ("war" in "toward" adds nothing).
+        """
+        if not q or not q.strip() or keyword_scan is None:
+            return []
+        text = (q or "").lower().strip()
+        topics = []  # [start, end, agent] per run of overlapping hits
+        for m in keyword_scan.finditer(text):
+            start, end, agent_name = m.start(1), m.end(1), keyword_agent[m.group(1)]
+            if topics and start < topics[-1][1]:
+                topic = topics[-1]
+                topic[1] = max(topic[1], end)
+                if rule_rank[agent_name] < rule_rank[topic[2]]:
+                    topic[2] = agent_name
+            else:
+                topics.append([start, end, agent_name])
+        if not topics:
+            return []
+        first = min((agent_name for _, _, agent_name in topics), key=rule_rank.__getitem__)
+        others = {agent_name for start, _, agent_name in topics if start == 0 or not text[start - 1].isalnum()}
+        return sorted(others | {first}, key=rule_rank.__getitem__)
+
+    def _last_user_content(messages: list) -> str:
+        """Content of the most recent user/human message ('' if none)."""
+        return next((message_content(m) for m in reversed(messages) if message_role(m) == "user"), "")
+
+    # Model routing decisions for opening questions, by normalized user message. A thread's first
+    # question is the whole conversation the model sees and options are fixed per supervisor, so the
+    # text is the whole key. Follow-ups ("and for 2019?") depend on the earlier turns and are never
+    # memoized. Only agent routes are kept: FINISH is also what a failed call yields.
+    route_cache: Dict[str, str] = {}
+
+    def _model_route(state: Dict[str, Any], user_content: str) -> str:
+        """Ask the supervisor model where the conversation should go, memoized for opening questions."""
+        messages = state.get("messages") or []
+        if sum(message_role(m) == "user" for m in messages) > 1:
+            return supervisor_chain.invoke(state).get("next", "FINISH")
+        key = " ".join(user_content.lower().split())
+        if key not in route_cache:
+            next_val = supervisor_chain.invoke(state).get("next", "FINISH")
+            if next_val == "FINISH":
+                return next_val
+            if len(route_cache) >= ROUTE_CACHE_SIZE:
+                route_cache.clear()
+            route_cache[key] = next_val
+        return route_cache[key]
 
     def supervisor_node(state: Dict[str, Any]) -> Dict[str, Any]:
-        result = supervisor_chain.invoke(state)
-        next_val = result.get("next", "FINISH")
         messages = state.get("messages") or []
         # If the last message is from an agent (assistant), go to FINISH to avoid supervisor→agent→supervisor→agent loops
-        last_role = _last_message_role(messages)
-        if last_role in ("assistant", "ai") and len(messages) > 2:
-            next_val = "FINISH"
-        # Whenever model didn't route to an agent, try to infer from the last user message (first turn only)
-        elif next_val == "FINISH":
-            last_user_content = ""
-            for m in reversed(messages):
-                role = (m.get("role") if isinstance(m, dict) else getattr(m, "type", "") or getattr(m, "role", ""))
-                if (isinstance(m, dict) and (m.get("role") or "").lower() == "user") or (str(role).lower() in ("user", "human")):
-                    last_user_content = _message_content(m) or ""
-                    break
-            inferred = _infer_route_from_query(last_user_content)
-            if inferred:
-                next_val = inferred
-        return {"next": next_val}
+        if messages and message_role(messages[-1]) == "assistant" and len(messages) > 2:
+            # After a fan-out, merge the agents' replies into one answer first
+            if isinstance(state.get("next"), list):
+                return {"next": "aggregator", "fanout": state["next"]}
+            return {"next": "FINISH"}
+        # Keyword rules are deterministic and cover most queries: only ask the model when they don't match.
+        # Independent topics ("GDP and disease outbreaks") fan out to their agents in parallel.
+        last_user_content = _last_user_content(messages)
+        inferred = _infer_routes_from_query(last_user_content)
+        if inferred:
+            return {"next": inferred if len(inferred) > 1 else inferred[0]}
+        if last_user_content.strip():
+            return {"next": _model_route(state, last_user_content)}
+        result = supervisor_chain.invoke(state)
+        return {"next": result.get("next", "FINISH")}
+
+    def aggregator_node(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge the fanned-out agents' latest replies into one assistant message."""
+        replies = {}
+        for m in reversed(state.get("messages") or []):
+            name = m.get("name") if isinstance(m, dict) else getattr(m, "name", None)
+            if name in state.get("fanout", []) and name not in replies and message_role(m) == "assistant":
+                replies[name] = message_content(m)
+        merged = "\n\n".join(f"**{name}**\n\n{replies[name]}" for name in state.get("fanout", []) if replies.get(name))
+        return {"messages": [AIMessage(content=merged or "No response from agents.", name="aggregator")]}
+
+    def route(state: Dict[str, Any]):
+        """Conditional edge: the chosen node, or one Send per agent for a fan-out."""
+        if isinstance(state["next"], list):
+            return [Send(name, state) for name in state["next"]]
+        return state["next"]
 
     # Build the graph
     workflow = StateGraph(AgentState)
 
-    # Add the supervisor node (chain + keyword fallback whenever model doesn't route)
+    # Add the supervisor node (keyword rules first, chain when they don't match)
     workflow.add_node("supervisor", supervisor_node)
+    workflow.add_node("aggregator", aggregator_node)
     
     # Add agent nodes
     for agent in agents:
@@ -213,12 +275,13 @@ def create_supervisor(agents: List[Any], model: BaseChatModel, prompt: str):
     for member in members:
         # After an agent finishes, return to supervisor
         workflow.add_edge(member, "supervisor")
+    workflow.add_edge("aggregator", END)
     
     # Define conditional edges from supervisor
     workflow.add_conditional_edges(
         "supervisor",
-        lambda x: x["next"],
-        {k: k for k in members} | {"FINISH": END}
+        route,
+        {k: k for k in members} | {"aggregator": "aggregator", "FINISH": END}
     )
     
     workflow.set_entry_point("supervisor")
@@ -4,6 +4,8 @@ Run: python main.py
 """
 
 import logging
+import os
+import sqlite3
 import sys
 
 from config import get_model, load_prompts
@@ -27,6 +29,7 @@ from agents import (
     create_economic_news_agent,
 )
 from langgraph_supervisor import create_supervisor
+from message_utils import message_content, message_role
 from langgraph.checkpoint.memory import InMemorySaver
 
 
@@ -56,7 +59,7 @@ print("[OK] All 8 agents created!")
 
 print("Building orchestrator...")
 prompts = load_prompts()
-model = get_model()
+model = get_model(role="router")
 
 workflow = create_supervisor(
     agents=[
@@ -73,7 +76,21 @@ workflow = create_supervisor(
     prompt=prompts['orchestrator'],
 )
 
-app = workflow.compile(checkpointer=InMemorySaver())
+def make_checkpointer():
+    """In-memory thread history by default. Set CHECKPOINT_DB to a file path to keep threads in
+    SQLite (WAL) across restarts; needs langgraph-checkpoint-sqlite. SqliteSaver is sync only:
+    server.py compiles its own graph with AsyncSqliteSaver (aiosqlite) on the same file."""
+    db_path = os.getenv("CHECKPOINT_DB", "").strip()
+    if not db_path:
+        return InMemorySaver()
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return SqliteSaver(conn)
+
+
+app = workflow.compile(checkpointer=make_checkpointer())
 print("[OK] ResilienceAI ready!\n")
 
 
@@ -81,20 +98,6 @@ print("[OK] ResilienceAI ready!\n")
 # CHAT INTERFACE
 # ============================================================
 
-def _message_content(msg) -> str:
-    """Get content from a message (dict or object)."""
-    if isinstance(msg, dict):
-        return (msg.get("content") or msg.get("text") or "").strip()
-    return (getattr(msg, "content", None) or getattr(msg, "text", None) or "").strip()
-
-
-def _is_assistant(msg) -> bool:
-    """True if message is from assistant (not user)."""
-    if isinstance(msg, dict):
-        return (msg.get("role") or "").lower() == "assistant"
-    return getattr(msg, "type", "") == "ai" or getattr(msg, "role", "").lower() == "assistant"
-
-
 def ask(question: str, thread_id: str = "main"):
     result = app.invoke(
         {"messages": [{"role": "user", "content": question}]},
@@ -103,12 +106,9 @@ def ask(question: str, thread_id: str = "main"):
     messages = result.get("messages") or []
     user_question = question.strip().lower()
     # Show last *assistant* reply, not last message (last might be the user message if supervisor finished without calling an agent)
-    for msg in reversed(messages):
-        if _is_assistant(msg):
-            content = _message_content(msg)
-            if content and content.strip().lower() != user_question:
-                return content
-    return "No response from agents. Try rephrasing or check that the supervisor routes to an agent."
+    replies = (message_content(msg).strip() for msg in reversed(messages) if message_role(msg) == "assistant")
+    return next((content for content in replies if content and content.lower() != user_question),
+                "No response from agents. Try rephrasing or check that the supervisor routes to an agent.")
 
 
 def main():
@@ -0,0 +1,31 @@
+"""
+ResilienceAI — Message helpers shared by the supervisor, main.ask() and the server.
+Messages arrive either as LangChain message objects or as plain {"role", "content"} dicts.
+"""
+from collections.abc import Mapping
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Message class -> normalized role; subclasses and other objects fall back to type/role
+_ROLE_BY_CLASS = {AIMessage: "assistant", HumanMessage: "user", SystemMessage: "system", ToolMessage: "tool"}
+_ROLE_ALIASES = {"ai": "assistant", "human": "user"}
+
+
+def message_content(msg) -> str:
+    """Content of a message (object or dict), '' if it has none."""
+    if isinstance(msg, Mapping):
+        return msg.get("content") or msg.get("text") or ""
+    return getattr(msg, "content", None) or getattr(msg, "text", None) or ""
+
+
+def message_role(msg) -> str:
+    """Normalized role: 'user', 'assistant', 'system', 'tool', ... or '' if unknown."""
+    role = _ROLE_BY_CLASS.get(type(msg))
+    if role:
+        return role
+    if isinstance(msg, Mapping):
+        role = msg.get("role") or ""
+    else:
+        role = getattr(msg, "type", "") or getattr(msg, "role", "") or ""
+    role = str(role).lower()
+    return _ROLE_ALIASES.get(role, role)
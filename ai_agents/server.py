@@ -1,14 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import logging
+import os
+import orjson
+from collections import deque
 from typing import List
-from main import app as agent_app, ask
+
+from main import app as agent_app, ask, workflow
+from message_utils import message_content, message_role
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("agent-server")
 
-app = FastAPI(title="ResilienceAI Agent Server")
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """With CHECKPOINT_DB set, serve from a graph compiled with the async SQLite checkpointer:
+    main.app's SqliteSaver is sync only and the endpoints drive the graph with astream/aget_state."""
+    global agent_app
+    db_path = os.getenv("CHECKPOINT_DB", "").strip()
+    if not db_path:
+        yield
+        return
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    async with AsyncSqliteSaver.from_conn_string(db_path) as checkpointer:
+        await checkpointer.setup()  # creates the tables and switches the file to WAL
+        await checkpointer.conn.execute("PRAGMA synchronous=NORMAL")
+        agent_app = workflow.compile(checkpointer=checkpointer)
+        logger.info("Thread history in %s", db_path)
+        yield
+
+app = FastAPI(title="ResilienceAI Agent Server", lifespan=lifespan)
+
+# Most recent node names kept in a response trace (consecutive repeats are collapsed)
+TRACE_MAX = 64
 
 class ChatRequest(BaseModel):
     message: str
@@ -22,13 +49,22 @@ class ChatResponse(BaseModel):
 async def health():
     return {"status": "ok"}
 
+def _final_answer(messages, question: str) -> str:
+    """Last assistant reply in the final state that isn't just the question echoed back (as in main.ask)."""
+    for msg in reversed(messages):
+        if message_role(msg) == "assistant":
+            content = message_content(msg)
+            if content and content.strip().lower() != question.strip().lower():
+                return content
+    return ""
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
     logger.info(f"Received question: {req.message} (thread: {req.thread_id})")
     try:
         # Use stream to capture the trace
         # The graph state has 'messages', but we care about which nodes ran.
-        trace = []
+        trace = deque(maxlen=TRACE_MAX)
         final_answer = ""
         
         # We need to construct the input exactly like main.ask does
@@ -36,63 +72,81 @@ async def chat_endpoint(req: ChatRequest):
         config = {"configurable": {"thread_id": req.thread_id}}
         
         # Stream events
-        # app.stream returns output from each node: {node_name: state_update}
-        print(f"[DEBUG] Starting stream for thread {req.thread_id}...")
-        for event in agent_app.stream(inputs, config=config):
-            print(f"[DEBUG] Event received: {event.keys()}")
+        # app.astream yields output from each node: {node_name: state_update}; awaiting it keeps the
+        # event loop free for other requests while agents and the LLM work
+        # The last agent/aggregator update already carries the answer, so no get_state() afterwards
+        logger.debug("Starting stream for thread %s", req.thread_id)
+        final_messages = []
+        async for event in agent_app.astream(inputs, config=config):
             for node_name, state_update in event.items():
-                trace.append(node_name)
-                # Check for final answer in the messages if this is the last step
-                if "messages" in state_update:
-                    messages = state_update["messages"]
-                    if messages:
-                        last_msg = messages[-1]
-                        # Extract text content
-                        content = ""
-                        if isinstance(last_msg, dict):
-                            content = last_msg.get("content") or ""
-                        else:
-                            content = getattr(last_msg, "content", "")
-                        
-                        if content and node_name != "supervisor":
-                             final_answer = content
+                if not trace or trace[-1] != node_name:
+                    trace.append(node_name)
+                if node_name != "supervisor" and state_update and state_update.get("messages"):
+                    final_messages = state_update["messages"]
 
         if not trace:
-            print("[WARN] Trace is empty! Stream might not have yielded events.")
+            logger.warning("Trace is empty! Stream might not have yielded events.")
         else:
-            print(f"[INFO] Captured trace: {trace}")
+            logger.info("Captured trace: %s", trace)
 
-        # If final_answer is empty, try to get it from the final state like ask() does
-        if not final_answer:
-            # Fallback to the logic in main.ask if streaming didn't catch it easily
-            # But we can't call ask() again easily without re-running.
-            # Let's hope the last agent's message is the answer.
-            # Or we can just inspect the last state? 
-            # app.stream yields ONE dict per node step.
-            pass
-            
-        # Re-verify final answer logic using the state snapshot if needed?
-        # Actually, let's use the 'ask' logic helper to extract the answer from the FINAL state
-        # app.get_state(config).values['messages']
-        final_state = agent_app.get_state(config)
-        messages = final_state.values.get("messages", [])
-        
         # Extract answer logic from main.ask (simplified)
-        for msg in reversed(messages):
-            if (getattr(msg, "role", "") == "assistant" or getattr(msg, "type", "") == "ai"):
-                content = getattr(msg, "content", "")
-                if content and content.strip().lower() != req.message.strip().lower():
-                    final_answer = content
-                    break
+        final_answer = _final_answer(final_messages, req.message)
         
         if not final_answer:
             final_answer = "No response from agents."
 
-        return ChatResponse(response=final_answer, trace=trace)
+        return ChatResponse(response=final_answer, trace=list(trace))
     except Exception as e:
         logger.error(f"Error processing request: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(payload) -> str:
+    return f"data: {orjson.dumps(payload, default=str).decode()}\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """Same graph run as /chat, streamed as Server-Sent Events while it happens:
+    {"node": name} when a graph node starts, {"node": name, "chunk": text} for agent model
+    output (token by token when the model streams, else one chunk per reply), then
+    {"response": ..., "trace": [...]} with the final answer and "[DONE]"."""
+    logger.info(f"Received streaming question: {req.message} (thread: {req.thread_id})")
+    inputs = {"messages": [{"role": "user", "content": req.message}]}
+    config = {"configurable": {"thread_id": req.thread_id}}
+    graph_nodes = set(agent_app.nodes) - {"__start__"}
+
+    async def events():
+        trace, streamed = deque(maxlen=TRACE_MAX), set()
+        try:
+            async for event in agent_app.astream_events(inputs, config=config, version="v2"):
+                metadata = event.get("metadata", {})
+                kind, node = event["event"], metadata.get("langgraph_node")
+                # Top-level node runs only (an agent's own graph starts again one level down)
+                if kind == "on_chain_start" and event["name"] in graph_nodes and len(event.get("parent_ids", ())) == 1:
+                    if not trace or trace[-1] != node:
+                        trace.append(node)
+                        yield _sse({"node": node})
+                # Supervisor output is only a routing word; stream what the agents write
+                elif kind in ("on_chat_model_stream", "on_chat_model_end") and node != "supervisor":
+                    if kind == "on_chat_model_stream":
+                        streamed.add(event["run_id"])
+                        chunk = getattr(event["data"].get("chunk"), "content", "")
+                    else:
+                        chunk = "" if event["run_id"] in streamed else getattr(event["data"].get("output"), "content", "")
+                    if chunk:
+                        # Label with the top-level node that owns this run ("economy_agent:<task>|agent:<task>"),
+                        # not the last node started: fanned-out agents stream at the same time
+                        owner = metadata.get("langgraph_checkpoint_ns", "").split(":", 1)[0] or node
+                        yield _sse({"node": owner, "chunk": chunk})
+            final_state = await agent_app.aget_state(config)
+            answer = _final_answer(final_state.values.get("messages", []), req.message)
+            yield _sse({"response": answer or "No response from agents.", "trace": list(trace)})
+        except Exception as e:
+            logger.error(f"Error processing streaming request: {e}", exc_info=True)
+            yield _sse({"error": str(e)})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
     print("\n[INFO] Starting Agent Server on http://localhost:8000")
@@ -0,0 +1,69 @@
+"""/chat/stream labels each chunk with the agent that wrote it, also when agents run in parallel."""
+import os
+import sys
+import types
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langgraph_supervisor import create_supervisor
+
+REPLIES = {
+    "economy_agent": "India's GDP grew by about seven percent in 2023.",
+    "disease_agent": "India reported several covid outbreaks in 2021.",
+}
+
+
+class FakeChatModel(GenericFakeChatModel):
+    """Scripted replies, streamed word by word; tools are accepted and never called."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@pytest.fixture(scope="module")
+def client():
+    agents = [create_react_agent(model=FakeChatModel(messages=iter([AIMessage(content=reply)])), tools=[], name=name)
+              for name, reply in REPLIES.items()]
+    workflow = create_supervisor(agents=agents, model=FakeChatModel(messages=iter([])), prompt="Route the question.")
+    # server imports the compiled graph from main, which builds the real agents and model
+    main = types.ModuleType("main")
+    main.workflow, main.app, main.ask = workflow, workflow.compile(checkpointer=InMemorySaver()), None
+    saved = sys.modules.get("main")
+    sys.modules["main"] = main
+    try:
+        sys.modules.pop("server", None)
+        import server
+        with TestClient(server.app) as test_client:
+            yield test_client
+    finally:
+        sys.modules.pop("server", None)
+        if saved is None:
+            sys.modules.pop("main", None)
+        else:
+            sys.modules["main"] = saved
+
+
+def test_fanout_chunks_are_labeled_by_agent(client):
+    with client.stream("POST", "/chat/stream", json={"message": "GDP and covid in India", "thread_id": "fanout"}) as r:
+        assert r.status_code == 200
+        lines = [line[len("data: "):] for line in r.iter_lines() if line.startswith("data: ")]
+    assert lines[-1] == "[DONE]"
+    events = [orjson.loads(line) for line in lines[:-1]]
+
+    chunks = {}
+    for event in events:
+        if "chunk" in event:
+            chunks.setdefault(event["node"], []).append(event["chunk"])
+    assert {node: "".join(parts) for node, parts in chunks.items()} == REPLIES
+
+    final = events[-1]
+    assert set(REPLIES) <= set(final["trace"])
+    assert all(reply in final["response"] for reply in REPLIES.values())
@@ -4,15 +4,21 @@ ResilienceAI — Full 8-Agent Risk Scoring Engine
 Reads all 8 agent CSVs from data/ folder, computes per-country risk scores,
 and outputs data/risk_scores.json for the Next.js frontend.
 
-Usage: python scripts/risk_engine.py [year]
+Usage: python scripts/risk_engine.py [year] [--ndjson]
 Default year: 2024
+--ndjson writes data/risk_scores.ndjson (one country per line) plus data/risk_scores.meta.json
+(metadata, summary, alerts, threat matrix) instead of risk_scores.json.
 """
 
 import pandas as pd
 import numpy as np
-import json
+import functools
+import orjson
+import os
+import pickle
 import sys
 import pycountry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from fips_map import FIPS_TO_ISO2
@@ -90,34 +96,66 @@ COUNTRY_GEO_ISO3 = {
 # 1. LOAD DATA
 # ============================================================
 
-def load_data():
-    """Load all 8 agent CSVs."""
-    news = pd.read_csv(DATA_DIR / "agent_news_stats.csv")
-    weather = pd.read_csv(DATA_DIR / "agent_weather.csv")
-    disaster = pd.read_csv(DATA_DIR / "agent_disaster.csv")
-    economy = pd.read_csv(DATA_DIR / "agent_economy.csv")
-    food = pd.read_csv(DATA_DIR / "agent_food.csv")
-    political = pd.read_csv(DATA_DIR / "agent_political.csv")
-    disease = pd.read_csv(DATA_DIR / "agent_disease.csv")
-    health = pd.read_csv(DATA_DIR / "agent_health.csv")
-
+def read_agent_csv(name: str, table: str) -> pd.DataFrame:
+    """Read one agent CSV, parsing only the columns in KEEP_COLS[table], with numeric year/month.
+    Integer columns are downcast. The parsed frame is pickled under data/.cache/ and reused until the CSV (or the kept columns) change."""
+    keep = KEEP_COLS[table]
+    src = DATA_DIR / f"agent_{name}.csv"
+    stat = src.stat()
+    source = (stat.st_mtime_ns, stat.st_size, sorted(keep), pd.__version__, "int-downcast")
+    cache_path = DATA_DIR / ".cache" / f"risk_{table}.pkl"
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if isinstance(cached, dict) and cached.get("source") == source:
+            return cached["df"]
+    except Exception:
+        pass  # missing, truncated or foreign cache file: parse the CSV again
+
+    df = pd.read_csv(src, usecols=lambda col: col in keep)
     # Normalize year columns to numeric
-    for df in [news, weather, disaster, economy, food, political, disease, health]:
-        if 'year' in df.columns:
-            df['year'] = pd.to_numeric(df['year'], errors='coerce')
-        if 'month' in df.columns:
-            df['month'] = pd.to_numeric(df['month'], errors='coerce')
-
-    return {
-        'news': news,
-        'weather': weather,
-        'disaster': disaster,
-        'economy': economy,
-        'food': food,
-        'political': political,
-        'disease': disease,
-        'health': health,
-    }
+    if 'year' in df.columns:
+        df['year'] = pd.to_numeric(df['year'], errors='coerce')
+    if 'month' in df.columns:
+        df['month'] = pd.to_numeric(df['month'], errors='coerce')
+    # Integer columns (event counts, year without gaps) in the narrowest int type; groupby sums
+    # come back as int64 so they can't overflow. Floats stay float64: the scores and details are
+    # rounded to 1-4 decimals and float32 would change them.
+    for col in df.select_dtypes('int64').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        # Written aside and renamed into place, so a concurrent or interrupted run never leaves a partial pickle
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"source": source, "df": df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write data cache {cache_path}: {e}")
+    return df
+
+# Table name -> agent CSV (data/agent_<name>.csv)
+AGENT_TABLES = {'news': "news_stats", 'weather': "weather", 'disaster': "disaster", 'economy': "economy",
+                'food': "food", 'political': "political", 'disease': "disease", 'health': "health"}
+
+@functools.lru_cache(maxsize=1)
+def load_data():
+    """Load all 8 agent CSVs, in parallel threads (the C parser releases the GIL while parsing).
+    Memoized for the process, so scoring several years loads them once; treat the frames as read-only."""
+    with ThreadPoolExecutor(max_workers=len(AGENT_TABLES)) as pool:
+        futures = {table: pool.submit(read_agent_csv, name, table) for table, name in AGENT_TABLES.items()}
+        data = {table: future.result() for table, future in futures.items()}
+
+    # Country keys as categoricals: groupbys compare integer codes instead of hashing strings.
+    # All tables share one category set per key so their codes line up. Every groupby on these keys
+    # passes observed=True: pandas 2.x would otherwise add a row for each category missing from the
+    # table, and scoring would turn it into a country with zero-valued (or defaulted) data.
+    for key in ('country_code', 'country_name'):
+        keyed = [df for df in data.values() if key in df.columns]
+        dtype = pd.CategoricalDtype(sorted(set().union(*(df[key].dropna().unique() for df in keyed))))
+        for df in keyed:
+            df[key] = df[key].astype(dtype)
+    return data
 
 # ============================================================
 # 2. SCORING FUNCTIONS
@@ -141,287 +179,403 @@ def safe_int(val, default=0):
     except:
         return default
 
-def score_conflict(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    instability = safe_float(df['instability_index'].mean())
-    conflict_ratio = safe_float(df['conflict_ratio'].mean())
-    war_events = safe_int(df['war_events'].sum())
-    protests = safe_int(df['protest_events'].sum())
-    sanctions = safe_int(df['sanctions_coercion_events'].sum())
-    goldstein = safe_float(df['avg_goldstein_scale'].mean())
-    tone = safe_float(df['avg_tone'].mean())
-
-    instability_norm = min(instability / 1.5 * 100, 100)
-    conflict_norm = min(conflict_ratio * 200, 100)
-    goldstein_norm = min(max(((-goldstein) + 5) / 10 * 100, 0), 100)
-    tone_norm = min(max((-tone + 5) / 10 * 100, 0), 100)
+def finite(s: pd.Series) -> pd.Series:
+    """safe_float over a column: NaN/inf -> 0."""
+    return s.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+def count(s: pd.Series) -> pd.Series:
+    """safe_int over a column (truncated, NaN/inf -> 0), kept as floats for the score arithmetic."""
+    return np.trunc(finite(s.astype(float)))
+
+def aggregate(rows: pd.DataFrame, key: str, spec: dict) -> pd.DataFrame:
+    """One row per `key` value of the year's `rows`; spec maps each column to 'mean' or 'sum'."""
+    if key not in rows.columns:
+        return pd.DataFrame(columns=list(spec))
+    return rows.groupby(key, sort=False, observed=True).agg({col: how for col, how in spec.items() if col in rows.columns})
+
+def scalar_scores(score: pd.Series, numpy_rows: pd.Series = None) -> pd.Series:
+    """Scores typed as the per-country formulas typed them: Python floats, and numpy floats in
+    numpy_rows (where a np.log1p term survives the clipping). round() rounds the two differently
+    (numpy scales by 10 and rounds half to even, Python rounds the exact value), so keeping the
+    types keeps every published 1-decimal score and composite the same."""
+    numpy_rows = numpy_rows.tolist() if numpy_rows is not None else [False] * len(score)
+    return pd.Series([np.float64(s) if n else s for s, n in zip(score.tolist(), numpy_rows)], index=score.index, dtype=object)
+
+def round_score(score):
+    """round(max(0, min(score, 100)), 1) on one scalar score; out-of-range scores become int 0/100."""
+    return round(max(0, min(score, 100)), 1)
+
+def round_scores(score: pd.Series) -> pd.Series:
+    """round_score() for every country, keeping each result's type (Series.map would make them all float64)."""
+    return pd.Series([round_score(s) for s in score], index=score.index, dtype=object)
+
+def domain_result(score: pd.Series, details: dict, key, extra: dict = None) -> dict:
+    """One country's {"score", "details"} from a score_* output; details map name -> (column, ndigits or None for ints).
+    Detail columns come out of finite()/count(), so no per-value NaN checks here."""
+    if key not in score.index:
+        return {"score": 0, "details": {}}
+    result = {"score": round_score(score[key]),
+              "details": {name: int(col[key]) if ndigits is None else round(float(col[key]), ndigits)
+                          for name, (col, ndigits) in details.items()}}
+    result["details"].update(extra or {})
+    return result
+
+# Each score_* takes the per-country aggregate (built with its *_AGG spec) and returns the
+# scores as one Series plus the detail columns, so the arithmetic runs once for all countries.
+# The scores come out of scalar_scores(), so they round like the per-country formulas did.
+CONFLICT_AGG = {'instability_index': 'mean', 'conflict_ratio': 'mean', 'war_events': 'sum', 'protest_events': 'sum',
+                'sanctions_coercion_events': 'sum', 'avg_goldstein_scale': 'mean', 'avg_tone': 'mean'}
+
+def score_conflict(agg: pd.DataFrame):
+    instability = finite(agg['instability_index'])
+    conflict_ratio = finite(agg['conflict_ratio'])
+    goldstein = finite(agg['avg_goldstein_scale'])
+    tone = finite(agg['avg_tone'])
+
+    instability_norm = np.minimum(instability / 1.5 * 100, 100)
+    conflict_norm = np.minimum(conflict_ratio * 200, 100)
+    goldstein_norm = np.clip(((-goldstein) + 5) / 10 * 100, 0, 100)
+    tone_norm = np.clip((-tone + 5) / 10 * 100, 0, 100)
 
     score = instability_norm * 0.35 + conflict_norm * 0.25 + goldstein_norm * 0.20 + tone_norm * 0.20
-    return {
-        "score": round(max(0, min(score, 100)), 1),
-        "details": {"instability_index": round(instability, 4), "conflict_ratio": round(conflict_ratio, 4), 
-                    "war_events": war_events, "protest_events": protests, "sanctions_events": sanctions,
-                    "goldstein_scale": round(goldstein, 3), "media_tone": round(tone, 3)}
-    }
-
-def score_political(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    tension = safe_float(df['political_tension_score'].mean()) if 'political_tension_score' in df.columns else 0
-    instability = safe_float(df['instability_index'].mean()) if 'instability_index' in df.columns else 0
-    conflict_ratio = safe_float(df['conflict_ratio'].mean()) if 'conflict_ratio' in df.columns else 0
-    coop_vs_conf = safe_float(df['cooperation_vs_conflict'].mean()) if 'cooperation_vs_conflict' in df.columns else 0
-
-    score = (min(tension/30*100, 100) * 0.35 + min(instability/1.5*100, 100) * 0.25 + 
-             min(conflict_ratio*200, 100) * 0.20 + min(max((-coop_vs_conf+1)/2*100, 0), 100) * 0.20)
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"political_tension": round(tension, 3), "instability_index": round(instability, 4), "conflict_ratio": round(conflict_ratio, 4), "cooperation_vs_conflict": round(coop_vs_conf, 3)}}
-
-def score_weather(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    severity = safe_float(df['weather_severity'].mean())
-    temp_z = safe_float(df['temp_anomaly_zscore'].mean())
-    precip_z = safe_float(df['precip_anomaly_zscore'].mean())
-    drought = safe_float(df['drought_index'].mean())
-    heat = safe_float(df['heat_stress'].mean())
-
-    score = (min(severity*100, 100)*0.3 + min(abs(temp_z)*30, 100)*0.2 + 
-             min(abs(precip_z)*30, 100)*0.2 + min(drought/5*100, 100)*0.2 + min(heat*100, 100)*0.1)
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"weather_severity": round(severity, 3), "temp_anomaly_zscore": round(temp_z, 3), "precip_anomaly_zscore": round(precip_z, 3), "drought_index": round(drought, 3), "heat_stress": round(heat, 3)}}
-
-def score_disaster(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    total_events = safe_int(df['Total Events'].sum())
-    deaths = safe_int(df['Total Deaths'].sum())
-    affected = safe_int(df['Total Affected'].sum())
-    damage = safe_float(df['Total Damage (USD, adjusted)'].sum())
-    
-    score = (min(total_events/30*100, 100)*0.25 + min(np.log1p(deaths)/np.log1p(10000)*100, 100)*0.30 +
-             min(np.log1p(affected)/np.log1p(10000000)*100, 100)*0.25 + min(np.log1p(damage)/np.log1p(10000000000)*100, 100)*0.20)
+    return scalar_scores(score), {"instability_index": (instability, 4), "conflict_ratio": (conflict_ratio, 4),
+                   "war_events": (count(agg['war_events']), None), "protest_events": (count(agg['protest_events']), None),
+                   "sanctions_events": (count(agg['sanctions_coercion_events']), None),
+                   "goldstein_scale": (goldstein, 3), "media_tone": (tone, 3)}
+
+POLITICAL_AGG = {'political_tension_score': 'mean', 'instability_index': 'mean', 'conflict_ratio': 'mean', 'cooperation_vs_conflict': 'mean'}
+
+def score_political(agg: pd.DataFrame):
+    column = lambda c: finite(agg[c]) if c in agg.columns else pd.Series(0.0, index=agg.index)
+    tension = column('political_tension_score')
+    instability = column('instability_index')
+    conflict_ratio = column('conflict_ratio')
+    coop_vs_conf = column('cooperation_vs_conflict')
+
+    score = (np.minimum(tension/30*100, 100) * 0.35 + np.minimum(instability/1.5*100, 100) * 0.25 +
+             np.minimum(conflict_ratio*200, 100) * 0.20 + np.clip((-coop_vs_conf+1)/2*100, 0, 100) * 0.20)
+    return scalar_scores(score), {"political_tension": (tension, 3), "instability_index": (instability, 4), "conflict_ratio": (conflict_ratio, 4), "cooperation_vs_conflict": (coop_vs_conf, 3)}
+
+WEATHER_AGG = {'weather_severity': 'mean', 'temp_anomaly_zscore': 'mean', 'precip_anomaly_zscore': 'mean', 'drought_index': 'mean', 'heat_stress': 'mean'}
+
+def score_weather(agg: pd.DataFrame):
+    severity = finite(agg['weather_severity'])
+    temp_z = finite(agg['temp_anomaly_zscore'])
+    precip_z = finite(agg['precip_anomaly_zscore'])
+    drought = finite(agg['drought_index'])
+    heat = finite(agg['heat_stress'])
+
+    score = (np.minimum(severity*100, 100)*0.3 + np.minimum(temp_z.abs()*30, 100)*0.2 +
+             np.minimum(precip_z.abs()*30, 100)*0.2 + np.minimum(drought/5*100, 100)*0.2 + np.minimum(heat*100, 100)*0.1)
+    return scalar_scores(score), {"weather_severity": (severity, 3), "temp_anomaly_zscore": (temp_z, 3), "precip_anomaly_zscore": (precip_z, 3), "drought_index": (drought, 3), "heat_stress": (heat, 3)}
+
+DISASTER_AGG = {'Total Events': 'sum', 'Total Deaths': 'sum', 'Total Affected': 'sum', 'Total Damage (USD, adjusted)': 'sum'}
+
+def score_disaster(agg: pd.DataFrame):
+    total_events = count(agg['Total Events'])
+    deaths = count(agg['Total Deaths'])
+    affected = count(agg['Total Affected'])
+    damage = finite(agg['Total Damage (USD, adjusted)'])
     
-    dtype_counts = df['Disaster Type'].value_counts().to_dict() if 'Disaster Type' in df.columns else {}
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"total_events": total_events, "deaths": deaths, "affected": affected, "damage_usd": round(damage, 2), "disaster_types": dtype_counts}}
-
-def score_economy(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    inflation = safe_float(df['inflation_cpi_annual_pct'].mean())
-    trade_pct = safe_float(df['trade_pct_gdp'].mean())
-    price_spikes = safe_int(df['total_price_spikes'].sum())
-    hhi = safe_float(df['avg_hhi_concentration'].mean())
-    high_risk = safe_int(df['high_risk_dependencies_count'].sum())
+    deaths_norm = np.log1p(deaths)/np.log1p(10000)*100
+    affected_norm = np.log1p(affected)/np.log1p(10000000)*100
+    damage_norm = np.log1p(damage)/np.log1p(10000000000)*100
+    score = (np.minimum(total_events/30*100, 100)*0.25 + np.minimum(deaths_norm, 100)*0.30 +
+             np.minimum(affected_norm, 100)*0.25 + np.minimum(damage_norm, 100)*0.20)
+    return scalar_scores(score, (deaths_norm <= 100) | (affected_norm <= 100) | (damage_norm <= 100)), {"total_events": (total_events, None), "deaths": (deaths, None), "affected": (affected, None), "damage_usd": (damage, 2)}
+
+ECONOMY_AGG = {'inflation_cpi_annual_pct': 'mean', 'trade_pct_gdp': 'mean', 'total_price_spikes': 'sum',
+               'avg_hhi_concentration': 'mean', 'high_risk_dependencies_count': 'sum'}
+
+def score_economy(agg: pd.DataFrame):
+    inflation = finite(agg['inflation_cpi_annual_pct'])
+    trade_pct = finite(agg['trade_pct_gdp'])
+    price_spikes = count(agg['total_price_spikes'])
+    hhi = finite(agg['avg_hhi_concentration'])
+    high_risk = count(agg['high_risk_dependencies_count'])
     
-    score = (min(abs(inflation)/20*100, 100)*0.3 + min(trade_pct/150*100, 100)*0.15 + 
-             min(price_spikes/10*100, 100)*0.2 + min(hhi/5000*100, 100)*0.2 + min(high_risk/5*100, 100)*0.15)
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"inflation_pct": round(inflation, 2), "trade_pct_gdp": round(trade_pct, 2), "price_spikes": price_spikes, "hhi_concentration": round(hhi, 2), "high_risk_dependencies": high_risk}}
-
-def score_food(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    exports = safe_float(df['food_export_total_value'].sum())
-    imports = safe_float(df['food_import_total_value'].sum())
-    production = safe_float(df['production'].sum())
-    wheat = safe_float(df['wheat_price_avg'].mean())
-    rice = safe_float(df['rice_price_avg'].mean())
+    score = (np.minimum(inflation.abs()/20*100, 100)*0.3 + np.minimum(trade_pct/150*100, 100)*0.15 + 
+             np.minimum(price_spikes/10*100, 100)*0.2 + np.minimum(hhi/5000*100, 100)*0.2 + np.minimum(high_risk/5*100, 100)*0.15)
+    return scalar_scores(score), {"inflation_pct": (inflation, 2), "trade_pct_gdp": (trade_pct, 2), "price_spikes": (price_spikes, None), "hhi_concentration": (hhi, 2), "high_risk_dependencies": (high_risk, None)}
+
+FOOD_AGG = {'food_export_total_value': 'sum', 'food_import_total_value': 'sum', 'production': 'sum', 'wheat_price_avg': 'mean', 'rice_price_avg': 'mean'}
+
+def score_food(agg: pd.DataFrame):
+    exports = finite(agg['food_export_total_value'])
+    imports = finite(agg['food_import_total_value'])
+    production = finite(agg['production'])
+    wheat = finite(agg['wheat_price_avg'])
+    rice = finite(agg['rice_price_avg'])
     
-    import_dep = imports / (imports + exports) if (imports+exports) > 0 else 0.5
+    import_dep = (imports / (imports + exports)).where((imports + exports) > 0, 0.5)
     avg_price = (wheat + rice) / 2
     
-    score = (min(import_dep*100, 100)*0.4 + min(avg_price/500*100, 100)*0.3 + 
-             min(max(100 - np.log1p(production)/np.log1p(1000000000)*100, 0), 100)*0.3)
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"food_import_dependency": round(import_dep, 3), "avg_food_price": round(avg_price, 2), "total_production": round(production, 0), "food_exports": round(exports, 0), "food_imports": round(imports, 0)}}
-
-def score_disease(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    outbreaks = safe_int(df['num_outbreaks'].sum())
-    cases = safe_int(df['total_confirmed_cases'].sum())
-    deaths = safe_int(df['total_outbreak_deaths'].sum())
-    cfr = safe_float(df['avg_cfr'].mean())
-    vacc = safe_float(df['fully_vaccinated_per_hundred'].mean())
-    alerts = safe_int(df['who_high_risk_alerts'].sum())
+    production_norm = 100 - np.log1p(production)/np.log1p(1000000000)*100
+    score = (np.minimum(import_dep*100, 100)*0.4 + np.minimum(avg_price/500*100, 100)*0.3 + 
+             np.clip(production_norm, 0, 100)*0.3)
+    return scalar_scores(score, production_norm >= 0), {"food_import_dependency": (import_dep, 3), "avg_food_price": (avg_price, 2), "total_production": (production, 0), "food_exports": (exports, 0), "food_imports": (imports, 0)}
+
+DISEASE_AGG = {'num_outbreaks': 'sum', 'total_confirmed_cases': 'sum', 'total_outbreak_deaths': 'sum', 'avg_cfr': 'mean',
+               'fully_vaccinated_per_hundred': 'mean', 'who_high_risk_alerts': 'sum'}
+
+def score_disease(agg: pd.DataFrame):
+    outbreaks = count(agg['num_outbreaks'])
+    cfr = finite(agg['avg_cfr'])
+    vacc = finite(agg['fully_vaccinated_per_hundred'])
+    alerts = count(agg['who_high_risk_alerts'])
     
-    vacc_norm = max(100 - vacc, 0) if vacc > 0 else 50
-    score = min(outbreaks/5*100, 100)*0.25 + min(cfr*10, 100)*0.25 + vacc_norm*0.25 + min(alerts/3*100, 100)*0.25
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"num_outbreaks": outbreaks, "total_cases": cases, "total_deaths": deaths, "avg_cfr": round(cfr, 3), "vaccination_rate": round(vacc, 1), "who_high_risk_alerts": alerts}}
-
-def score_health(df: pd.DataFrame) -> dict:
-    if df.empty: return {"score": 0, "details": {}}
-    exp = safe_float(df['health_expenditure_pct_gdp'].mean())
-    vacc = safe_float(df['vaccination_coverage_pct'].mean())
-    alerts = safe_int(df['active_who_alerts'].sum())
-    deaths = safe_int(df['outbreak_deaths'].sum())
+    vacc_norm = np.maximum(100 - vacc, 0).where(vacc > 0, 50)
+    score = np.minimum(outbreaks/5*100, 100)*0.25 + np.minimum(cfr*10, 100)*0.25 + vacc_norm*0.25 + np.minimum(alerts/3*100, 100)*0.25
+    return scalar_scores(score), {"num_outbreaks": (outbreaks, None), "total_cases": (count(agg['total_confirmed_cases']), None), "total_deaths": (count(agg['total_outbreak_deaths']), None),
+                   "avg_cfr": (cfr, 3), "vaccination_rate": (vacc, 1), "who_high_risk_alerts": (alerts, None)}
+
+HEALTH_AGG = {'health_expenditure_pct_gdp': 'mean', 'vaccination_coverage_pct': 'mean', 'active_who_alerts': 'sum', 'outbreak_deaths': 'sum'}
+
+def score_health(agg: pd.DataFrame):
+    exp = finite(agg['health_expenditure_pct_gdp'])
+    vacc = finite(agg['vaccination_coverage_pct'])
+    alerts = count(agg['active_who_alerts'])
+    deaths = count(agg['outbreak_deaths'])
     
-    exp_norm = min(max(100 - exp*10, 0), 100) if exp > 0 else 70
-    vacc_norm = max(100 - vacc, 0) if vacc > 0 else 50
-    
-    score = exp_norm*0.3 + vacc_norm*0.3 + min(alerts/3*100, 100)*0.2 + min(np.log1p(deaths)/np.log1p(10000)*100, 100)*0.2
-    return {"score": round(max(0, min(score, 100)), 1), "details": {"health_expenditure_pct_gdp": round(exp, 2), "vaccination_coverage_pct": round(vacc, 1), "active_who_alerts": alerts, "outbreak_deaths": deaths}}
-
-def compute_composite(scores: dict) -> dict:
-    weights = {'conflict': 0.20, 'political': 0.15, 'weather': 0.15, 'disaster': 0.15, 'economy': 0.12, 'food': 0.08, 'disease': 0.08, 'health': 0.07}
-    composite = sum(scores[k]['score'] * weights[k] for k in weights)
+    exp_norm = np.clip(100 - exp*10, 0, 100).where(exp > 0, 70)
+    vacc_norm = np.maximum(100 - vacc, 0).where(vacc > 0, 50)
     
-    if composite >= 70: level, color = "CRITICAL", "#dc2626"
-    elif composite >= 50: level, color = "HIGH", "#f97316"
-    elif composite >= 30: level, color = "MODERATE", "#eab308"
-    elif composite >= 15: level, color = "LOW", "#22c55e"
-    else: level, color = "MINIMAL", "#16a34a"
-    
-    domain_scores = {k: scores[k]['score'] for k in weights}
-    top = max(domain_scores, key=domain_scores.get)
-    threats = {'conflict': "Armed Conflict", 'political': "Political Instability", 'weather': "Extreme Weather", 'disaster': "Natural Disasters", 'economy': "Economic Crisis", 'food': "Food Insecurity", 'disease': "Disease Outbreak", 'health': "Health System Weakness"}
-    return {"composite_score": round(composite, 1), "risk_level": level, "color": color, "top_threat": threats[top], "domain_scores": domain_scores}
-
-def get_monthly_conflict(news, pol):
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    res = []
-    for m in range(1, 13):
-        n = news[news['month']==m] if not news.empty else pd.DataFrame()
-        p = pol[pol['month']==m] if not pol.empty else pd.DataFrame()
-        res.append({
-            "month": months[m-1],
-            "wars": safe_int(n['war_events'].sum()) if not n.empty else 0,
-            "protests": safe_int(p['protest_events'].sum()) if not p.empty else (safe_int(n['protest_events'].sum()) if not n.empty else 0),
-            "sanctions": safe_int(n['sanctions_coercion_events'].sum()) if not n.empty else 0
-        })
-    return res
-
-def get_monthly_weather(weath):
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    res = []
-    for m in range(1, 13):
-        w = weath[weath['month']==m] if not weath.empty else pd.DataFrame()
-        res.append({
-            "month": months[m-1],
-            "tempAnomaly": round(safe_float(w['temp_anomaly'].mean()), 1) if not w.empty else 0,
-            "precAnomaly": round(safe_float(w['precip_anomaly'].mean()), 1) if not w.empty else 0,
-            "drought": round(safe_float(w['drought_index'].mean()*10), 0) if not w.empty else 0
-        })
-    return res
-
-def get_disaster_breakdown(df):
-    if df.empty or 'Disaster Type' not in df.columns: return []
-    counts = df['Disaster Type'].value_counts()
-    total = counts.sum()
-    if total == 0: return []
-    colors = {"Flood": "#3b82f6", "Earthquake": "#ef4444", "Drought": "#f59e0b", "Storm": "#06b6d4", "Wildfire": "#f97316"}
-    return [{"name": str(k), "value": round(v/total*100, 1), "count": int(v), "color": colors.get(str(k), "#6b7280")} for k, v in counts.items()]
+    deaths_norm = np.log1p(deaths)/np.log1p(10000)*100
+    score = exp_norm*0.3 + vacc_norm*0.3 + np.minimum(alerts/3*100, 100)*0.2 + np.minimum(deaths_norm, 100)*0.2
+    return scalar_scores(score, deaths_norm <= 100), {"health_expenditure_pct_gdp": (exp, 2), "vaccination_coverage_pct": (vacc, 1), "active_who_alerts": (alerts, None), "outbreak_deaths": (deaths, None)}
+
+# Columns load_data() keeps per table: the keys plus what scoring, the monthly series,
+# the timelines and the disaster breakdown read. Everything else is skipped while parsing.
+KEY_COLS = {'country_code', 'country_name', 'iso3', 'year', 'month'}
+KEEP_COLS = {
+    'news': KEY_COLS | set(CONFLICT_AGG),
+    'weather': KEY_COLS | set(WEATHER_AGG) | {'temp_anomaly', 'precip_anomaly'},
+    'disaster': KEY_COLS | set(DISASTER_AGG) | {'Disaster Type'},
+    'economy': KEY_COLS | set(ECONOMY_AGG),
+    'food': KEY_COLS | set(FOOD_AGG),
+    'political': KEY_COLS | set(POLITICAL_AGG) | {'protest_events'},
+    'disease': KEY_COLS | set(DISEASE_AGG),
+    'health': KEY_COLS | set(HEALTH_AGG),
+}
 
-def get_yearly_timeline(code, data):
+WEIGHTS = {'conflict': 0.20, 'political': 0.15, 'weather': 0.15, 'disaster': 0.15, 'economy': 0.12, 'food': 0.08, 'disease': 0.08, 'health': 0.07}
+THREATS = {'conflict': "Armed Conflict", 'political': "Political Instability", 'weather': "Extreme Weather", 'disaster': "Natural Disasters", 'economy': "Economic Crisis", 'food': "Food Insecurity", 'disease': "Disease Outbreak", 'health': "Health System Weakness"}
+
+# Risk levels by composite score: a score >= LEVEL_BINS[i] is at least LEVELS[i + 1]
+LEVEL_BINS = np.array([15, 30, 50, 70])
+LEVELS = np.array(["MINIMAL", "LOW", "MODERATE", "HIGH", "CRITICAL"])
+LEVEL_COLORS = np.array(["#16a34a", "#22c55e", "#eab308", "#f97316", "#dc2626"])
+
+def compute_composites(scores_df: pd.DataFrame) -> pd.DataFrame:
+    """Composite score, risk level, color and top threat for every row of domain scores.
+    scores_df holds the rounded scalar scores (object columns), so the weighted sum and its
+    rounding run on the same Python/numpy floats as the per-country formula."""
+    composite = sum(scores_df[k] * weight for k, weight in WEIGHTS.items())
+    level = np.searchsorted(LEVEL_BINS, composite.to_numpy(dtype=float), side='right')
+    return pd.DataFrame({"composite_score": composite.map(lambda c: round(c, 1)),
+                         "risk_level": LEVELS[level],
+                         "color": LEVEL_COLORS[level],
+                         "top_threat": scores_df[list(WEIGHTS)].astype(float).idxmax(axis=1).map(THREATS)}, index=scores_df.index)
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def monthly_index(codes) -> pd.MultiIndex:
+    """(country_code, month) for all 12 months of each code, in `codes` order."""
+    return pd.MultiIndex.from_product([list(codes), range(1, 13)], names=['country_code', 'month'])
+
+def chunk_by_country(records: list, codes) -> dict:
+    """Split records in monthly_index(codes) order into country_code -> its 12 monthly records."""
+    return {code: records[i*12:(i+1)*12] for i, code in enumerate(codes)}
+
+def monthly_conflict(news, pol, codes):
+    """country_code -> 12 monthly war/protest/sanctions records, from one groupby per table.
+    A month without rows reads as 0 (protests fall back to news)."""
+    idx = monthly_index(codes)
+    n = news.groupby(['country_code', 'month'], observed=True)[['war_events', 'protest_events', 'sanctions_coercion_events']].sum().reindex(idx)
+    protests = pol.groupby(['country_code', 'month'], observed=True)['protest_events'].sum().reindex(idx).combine_first(n['protest_events'])
+    monthly = count(pd.DataFrame({"wars": n['war_events'], "protests": protests, "sanctions": n['sanctions_coercion_events']})).astype(int)
+    monthly.insert(0, "month", MONTHS * len(codes))
+    return chunk_by_country(monthly.to_dict('records'), codes)
+
+def monthly_weather(weath, codes):
+    """country_code -> 12 monthly weather records (0 for months without rows), from one groupby."""
+    idx = monthly_index(codes)
+    w = weath.groupby(['country_code', 'month'], observed=True)[['temp_anomaly', 'precip_anomaly', 'drought_index']].mean()
+    has_w = idx.isin(w.index)
+    w = finite(w.reindex(idx))
+    records = [{"month": m,
+                "tempAnomaly": round(temp, 1) if has else 0,
+                "precAnomaly": round(prec, 1) if has else 0,
+                "drought": round(drought*10, 0) if has else 0}
+               for m, has, temp, prec, drought in zip(MONTHS * len(codes), has_w, w['temp_anomaly'].tolist(), w['precip_anomaly'].tolist(), w['drought_index'].tolist())]
+    return chunk_by_country(records, codes)
+
+DISASTER_COLORS = {"Flood": "#3b82f6", "Earthquake": "#ef4444", "Drought": "#f59e0b", "Storm": "#06b6d4", "Wildfire": "#f97316"}
+
+def disaster_breakdowns(rows):
+    """country_code -> disaster type counts, and country_code -> breakdown entries, from the year's
+    disaster rows in one groupby. Types are in value_counts() order: most frequent first, ties by
+    first appearance."""
+    if 'country_code' not in rows.columns or 'Disaster Type' not in rows.columns:
+        return {}, {}
+    sizes = rows.groupby(['country_code', 'Disaster Type'], sort=False, observed=True).size().sort_values(ascending=False, kind='stable')
+    pct = (sizes / sizes.groupby(level=0, observed=True).transform('sum') * 100).round(1)
+    counts, breakdowns = {}, {}
+    for (code, name), n, value in zip(sizes.index, sizes.tolist(), pct.tolist()):
+        counts.setdefault(code, {})[name] = n
+        breakdowns.setdefault(code, []).append({"name": str(name), "value": value, "count": n, "color": DISASTER_COLORS.get(str(name), "#6b7280")})
+    return counts, breakdowns
+
+def yearly_timelines(data):
+    """(country_code, year) -> value maps behind get_yearly_timeline, one groupby per table for all countries."""
+    by_year = lambda df, col, how, clean: clean(df.groupby(['country_code', 'year'], observed=True)[col].agg(how)).to_dict() if 'country_code' in df.columns else {}
+    return (by_year(data['news'], 'instability_index', 'mean', finite),
+            by_year(data['weather'], 'weather_severity', 'mean', finite),
+            by_year(data['disaster'], 'Total Events', 'sum', count))
+
+def get_yearly_timeline(code, timelines):
+    instability, severity, events = timelines
     years = range(2000, 2025)
     res = []
     for y in years:
-        n = data['news'][(data['news']['country_code']==code) & (data['news']['year']==y)]
-        w = data['weather'][(data['weather']['country_code']==code) & (data['weather']['year']==y)]
-        d = data['disaster'][(data['disaster']['country_code']==code) & (data['disaster']['year']==y)] if 'country_code' in data['disaster'].columns else pd.DataFrame()
-        
-        inst = round(safe_float(n['instability_index'].mean())*50, 1) if not n.empty else 0
-        weath = round(safe_float(w['weather_severity'].mean())*100, 1) if not w.empty else 0
-        evts = safe_int(d['Total Events'].sum()) if not d.empty else 0
+        inst = round(instability[code, y]*50, 1) if (code, y) in instability else 0
+        weath = round(severity[code, y]*100, 1) if (code, y) in severity else 0
+        evts = int(events[code, y]) if (code, y) in events else 0
         res.append({"year": y, "instability": min(inst, 100), "weather": min(weath, 100), "disasters": evts})
     return res
 
-def generate_alerts(results):
-    sorted_c = sorted(results.values(), key=lambda x: x['composite_score'], reverse=True)[:15]
+# Alert text by a country's top-scoring domain (any other domain gets the generic text)
+ALERT_TEXT = {
+    'conflict': lambda c: f"{c['country_name']}: Instability {c['conflict_details'].get('instability_index', 0):.2f}, War events {c['conflict_details'].get('war_events', 0)}",
+    'disaster': lambda c: f"{c['country_name']}: {c['disaster_details'].get('total_events', 0)} disasters, {c['disaster_details'].get('deaths', 0):,} deaths",
+    'weather': lambda c: f"{c['country_name']}: Severe weather, drought index {c['weather_details'].get('drought_index', 0):.1f}",
+}
+ALERT_SEVERITY = {"CRITICAL": "critical", "HIGH": "high"}
+
+def generate_alerts(scored, results, top_n=15):
+    """Alerts for the top_n composite scores. `scored` has one row per result (domain scores and
+    composite_score, indexed by country_code); `results` supplies the names and details for the text."""
+    top = scored['composite_score'].nlargest(top_n)
+    top_domains = scored.loc[top.index, list(WEIGHTS)].idxmax(axis=1)
+    by_code = {c['country_code']: c for c in results.values()}
     alerts = []
-    id_ = 1
-    for c in sorted_c:
-        sev = "critical" if c['risk_level']=="CRITICAL" else "high" if c['risk_level']=="HIGH" else "moderate"
-        dom = max(c['domain_scores'], key=c['domain_scores'].get)
-        if dom == 'conflict': text = f"{c['country_name']}: Instability {c['conflict_details'].get('instability_index', 0):.2f}, War events {c['conflict_details'].get('war_events', 0)}"
-        elif dom == 'disaster': text = f"{c['country_name']}: {c['disaster_details'].get('total_events', 0)} disasters, {c['disaster_details'].get('deaths', 0):,} deaths"
-        elif dom == 'weather': text = f"{c['country_name']}: Severe weather, drought index {c['weather_details'].get('drought_index', 0):.1f}"
-        else: text = f"{c['country_name']}: High risk detected in {dom} sector"
-        alerts.append({"id": id_, "severity": sev, "text": text, "country": c.get('iso3', '').lower()})
-        id_ += 1
+    for id_, (code, dom) in enumerate(top_domains.items(), 1):
+        c = by_code[code]
+        text = ALERT_TEXT[dom](c) if dom in ALERT_TEXT else f"{c['country_name']}: High risk detected in {dom} sector"
+        alerts.append({"id": id_, "severity": ALERT_SEVERITY.get(c['risk_level'], "moderate"), "text": text, "country": c.get('iso3', '').lower()})
     return alerts
 
-def generate_threat_matrix(results):
-    high = [c for c in results.values() if c['composite_score'] >= 30] or list(results.values())
-    avg = lambda dom: round(np.mean([c['domain_scores'].get(dom, 0) for c in high]))
-    c, w, d, e = avg('conflict'), avg('weather'), avg('disease'), avg('economy')
-    return [
-        {"supply": "Food", "conflict": min(round(c*0.85), 100), "weather": min(round(w*0.95), 100), "pandemic": min(round(d*0.6), 100), "trade": min(round(e*0.8), 100)},
-        {"supply": "Medicine", "conflict": min(round(c*0.75), 100), "weather": min(round(w*0.4), 100), "pandemic": min(round(d*1.1), 100), "trade": min(round(e*0.9), 100)},
-        {"supply": "Energy", "conflict": min(round(c*0.95), 100), "weather": min(round(w*0.7), 100), "pandemic": min(round(d*0.35), 100), "trade": min(round(e*1.0), 100)},
-        {"supply": "Water", "conflict": min(round(c*0.7), 100), "weather": min(round(w*1.1), 100), "pandemic": min(round(d*0.25), 100), "trade": min(round(e*0.4), 100)},
-        {"supply": "Fuel", "conflict": min(round(c*0.9), 100), "weather": min(round(w*0.6), 100), "pandemic": min(round(d*0.3), 100), "trade": min(round(e*1.05), 100)}
-    ]
+# Supply chain exposure to each threat: supply x (conflict, weather, pandemic, trade) multipliers
+# applied to the average conflict, weather, disease and economy scores
+SUPPLIES = ["Food", "Medicine", "Energy", "Water", "Fuel"]
+THREAT_DOMAINS = {"conflict": "conflict", "weather": "weather", "pandemic": "disease", "trade": "economy"}
+SUPPLY_MULT = np.array([[0.85, 0.95, 0.6, 0.8],
+                        [0.75, 0.4, 1.1, 0.9],
+                        [0.95, 0.7, 0.35, 1.0],
+                        [0.7, 1.1, 0.25, 0.4],
+                        [0.9, 0.6, 0.3, 1.05]])
+
+def generate_threat_matrix(scores_df):
+    """Threat matrix from the scored countries' domain scores and composite_score (one row per country)."""
+    high = scores_df[scores_df['composite_score'] >= 30]
+    if high.empty:
+        high = scores_df
+    avg = np.round(high[list(THREAT_DOMAINS.values())].mean().to_numpy())
+    matrix = np.minimum(np.round(SUPPLY_MULT * avg), 100).astype(int)
+    return [{"supply": supply, **dict(zip(THREAT_DOMAINS, row.tolist()))} for supply, row in zip(SUPPLIES, matrix)]
 
 # ============================================================
 # 8. ISO3 HELPER
 # ============================================================
 
-def get_iso3(row):
+def _alpha3(iso2):
+    try:
+        c = pycountry.countries.get(alpha_2=iso2)
+        return c.alpha_3 if c else None
+    except:
+        return None
+
+# FIPS -> ISO3 for every FIPS code pycountry can resolve
+FIPS_TO_ISO3 = {fips: iso3 for fips, iso3 in ((f, _alpha3(i)) for f, i in FIPS_TO_ISO2.items()) if iso3}
+
+def _fuzzy_iso3(name):
+    try:
+        return pycountry.countries.search_fuzzy(name)[0].alpha_3
+    except:
+        return ""
+
+def resolve_iso3(rows: pd.DataFrame) -> pd.Series:
     """
-    Robustly determine ISO3 code for a country row.
-    1. Check if 'iso3' column is populated.
-    2. If not, use 'country_code' (FIPS) -> ISO2 -> ISO3.
-    3. If FIPS mapping fails, use 'country_name' -> ISO3 via pycountry.
+    Robustly determine ISO3 codes for country rows, all at once.
+    1. Use the 'iso3' column where populated.
+    2. If not, use 'country_code' (FIPS) -> ISO3.
+    3. If FIPS mapping fails, use 'country_name' -> ISO3 via pycountry's fuzzy search ("" if none).
     """
-    iso3 = row['iso3'] if pd.notna(row['iso3']) and row['iso3'] != "" else None
-    if iso3:
-        return iso3.upper()
-    
-    fips = row['country_code']
-    if fips in FIPS_TO_ISO2:
-        iso2 = FIPS_TO_ISO2[fips]
-        try:
-            c = pycountry.countries.get(alpha_2=iso2)
-            if c: return c.alpha_3
-        except:
-            pass
-            
-    name = row['country_name']
-    if name:
-        try:
-            c = pycountry.countries.search_fuzzy(name)[0]
-            return c.alpha_3
-        except:
-            pass
-            
-    return ""
+    iso3 = rows['iso3'].where(rows['iso3'].notna() & (rows['iso3'] != "")).str.upper()
+    iso3 = iso3.fillna(rows['country_code'].map(FIPS_TO_ISO3))
+    missing = iso3.isna()
+    if missing.any():
+        # Plain values: mapping the categorical would fuzzy-search every country name it knows
+        iso3[missing] = rows.loc[missing, 'country_name'].astype(object).map(_fuzzy_iso3)
+    return iso3.fillna("")
 
 # ============================================================
 # 9. MAIN RUN
 # ============================================================
 
-def compute_all_scores(year: int = 2024):
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def json_default(obj):
+    """Values orjson can't encode itself: pandas NA -> null, anything else as its str()."""
+    return None if pd.api.types.is_scalar(obj) and pd.isna(obj) else str(obj)
+
+def compute_all_scores(year: int = 2024, ndjson: bool = False):
     print(f"Scoring all countries for {year}...")
     data = load_data()
-    # Get unique codes from news
-    codes = data['news'][data['news']['year']==year]['country_code'].unique()
+    # Each table filtered to the year once; everything below works on these
+    rows = {table: df[df['year']==year] for table, df in data.items()}
+    # First news row per country for the year (name and ISO3 come from it)
+    firsts = rows['news'].drop_duplicates('country_code')
+    iso3s = resolve_iso3(firsts)
     
+    # Every domain scored for all countries at once; the loop below only looks rows up
+    domains = {
+        'conflict': score_conflict(aggregate(rows['news'], 'country_code', CONFLICT_AGG)),
+        'political': score_political(aggregate(rows['political'], 'country_code', POLITICAL_AGG)),
+        'weather': score_weather(aggregate(rows['weather'], 'country_code', WEATHER_AGG)),
+        'disaster': score_disaster(aggregate(rows['disaster'], 'country_code', DISASTER_AGG)),
+        'economy': score_economy(aggregate(rows['economy'], 'country_name', ECONOMY_AGG)),
+        'food': score_food(aggregate(rows['food'], 'country_name', FOOD_AGG)),
+        'disease': score_disease(aggregate(rows['disease'], 'country_name', DISEASE_AGG)),
+        'health': score_health(aggregate(rows['health'], 'country_name', HEALTH_AGG)),
+    }
+    by_name = {'economy', 'food', 'disease', 'health'}
+
+    # Countries x domains score matrix (0 where a country has no rows for a domain) and the
+    # composites from it, computed for all countries together and read back per country below
+    scores_df = pd.DataFrame({k: round_scores(score).reindex(firsts['country_name' if k in by_name else 'country_code'], fill_value=0).to_numpy()
+                              for k, (score, _) in domains.items()}, index=firsts['country_code'])
+    composites_df = compute_composites(scores_df)
+    composites = composites_df.to_dict('index')
+    type_counts, breakdowns = disaster_breakdowns(rows['disaster'])
+
+    # Skip countries without ISO3 as they won't map to UI
+    resolved = (iso3s != "").to_numpy()
+    for code, name in zip(firsts['country_code'][~resolved], firsts['country_name'][~resolved]):
+        print(f"Warning: Could not resolve ISO3 for {name} ({code})")
+
+    codes = firsts['country_code'][resolved].tolist()
+    conflict_months = monthly_conflict(rows['news'], rows['political'], codes)
+    weather_months = monthly_weather(rows['weather'], codes)
+    print("Generating timelines...")
+    timelines = yearly_timelines(data)
+
     results = {}
-    for code in codes:
-        # Get basics
-        row = data['news'][(data['news']['country_code']==code) & (data['news']['year']==year)].iloc[0]
-        name = row['country_name']
-        iso3 = get_iso3(row)
-        
-        if not iso3:
-            print(f"Warning: Could not resolve ISO3 for {name} ({code})")
-            # Skip countries without ISO3 as they won't map to UI
-            continue
-        
-        # Slices
-        n = data['news'][(data['news']['country_code']==code) & (data['news']['year']==year)]
-        w = data['weather'][(data['weather']['country_code']==code) & (data['weather']['year']==year)]
-        d = data['disaster'][(data['disaster']['country_code']==code) & (data['disaster']['year']==year)] if 'country_code' in data['disaster'].columns else pd.DataFrame()
-        e = data['economy'][(data['economy']['country_name']==name) & (data['economy']['year']==year)]
-        f = data['food'][(data['food']['country_name']==name) & (data['food']['year']==year)]
-        p = data['political'][(data['political']['country_code']==code) & (data['political']['year']==year)]
-        di = data['disease'][(data['disease']['country_name']==name) & (data['disease']['year']==year)]
-        h = data['health'][(data['health']['country_name']==name) & (data['health']['year']==year)]
+    for code, name, iso3 in zip(firsts['country_code'][resolved], firsts['country_name'][resolved], iso3s[resolved]):
         
-        scores = {
-            'conflict': score_conflict(n),
-            'political': score_political(p),
-            'weather': score_weather(w),
-            'disaster': score_disaster(d),
-            'economy': score_economy(e),
-            'food': score_food(f),
-            'disease': score_disease(di),
-            'health': score_health(h),
-        }
-        
-        comp = compute_composite(scores)
+        scores = {k: domain_result(*domains[k], name if k in by_name else code,
+                                   {"disaster_types": type_counts.get(code, {})} if k == 'disaster' else None) for k in domains}
+        comp = composites[code]
         
         # Geo
         geo = COUNTRY_GEO_ISO3.get(iso3, {"lat": 0, "lng": 0})
@@ -432,7 +586,7 @@ def compute_all_scores(year: int = 2024):
         results[key] = {
             "id": key,
             "country_code": code,
-            "country_name": name,
+            "country_name": name if pd.notna(name) else 0.0,  # unnamed rows were always written as 0.0
             "iso3": iso3,
             "lat": geo['lat'],
             "lng": geo['lng'],
@@ -440,8 +594,8 @@ def compute_all_scores(year: int = 2024):
             "risk_level": comp['risk_level'],
             "color": comp['color'],
             "top_threat": comp['top_threat'],
-            "domain_scores": comp['domain_scores'],
-            "active_disasters": safe_int(d['Total Events'].sum()) if not d.empty else 0,
+            "domain_scores": {k: scores[k]['score'] for k in WEIGHTS},
+            "active_disasters": scores['disaster']['details'].get('total_events', 0),
             "conflict_details": scores['conflict']['details'],
             "political_details": scores['political']['details'],
             "weather_details": scores['weather']['details'],
@@ -450,47 +604,46 @@ def compute_all_scores(year: int = 2024):
             "food_details": scores['food']['details'],
             "disease_details": scores['disease']['details'],
             "health_details": scores['health']['details'],
-            "monthly_conflict": get_monthly_conflict(n, p),
-            "monthly_weather": get_monthly_weather(w),
-            "disaster_breakdown": get_disaster_breakdown(d)
+            "monthly_conflict": conflict_months[code],
+            "monthly_weather": weather_months[code],
+            "disaster_breakdown": breakdowns.get(code, []),
+            "timeline": get_yearly_timeline(code, timelines)
         }
 
-    print("Generating timelines...")
-    for k, v in results.items():
-        v['timeline'] = get_yearly_timeline(v['country_code'], data)
-        
-    hotspots = sum(1 for c in results.values() if c['composite_score']>=50)
-    conf_ev = safe_int(data['news'][data['news']['year']==year]['war_events'].sum())
-    dis_ev = safe_int(data['disaster'][data['disaster']['year']==year]['Total Events'].sum()) if 'Total Events' in data['disaster'].columns else 0
+    # Score rows of the countries in the results (a duplicate ISO3 keeps the last one)
+    scored = scores_df.join(composites_df['composite_score']).loc[[c['country_code'] for c in results.values()]].astype(float)
+    hotspots = int((scored['composite_score'].to_numpy() >= 50).sum())
+    conf_ev = safe_int(rows['news']['war_events'].sum())
+    dis_ev = safe_int(rows['disaster']['Total Events'].sum()) if 'Total Events' in rows['disaster'].columns else 0
     total_dp = sum(len(df) for df in data.values())
     
     output = {
         "metadata": {"generated_at": datetime.now().isoformat(), "year": year, "countries_scored": len(results)},
         "summary": {"total_countries": len(results), "active_hotspots": hotspots, "total_conflict_events": conf_ev, "total_disasters": dis_ev, "total_data_points": total_dp},
-        "alerts": generate_alerts(results),
-        "threat_matrix": generate_threat_matrix(results),
+        "alerts": generate_alerts(scored, results),
+        "threat_matrix": generate_threat_matrix(scored),
         "countries": results
     }
 
-    # Recursively clean NaNs to ensure valid JSON
-    def clean_nans(obj):
-        if isinstance(obj, float):
-            return 0.0 if (np.isnan(obj) or np.isinf(obj)) else obj
-        if isinstance(obj, dict):
-            return {k: clean_nans(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [clean_nans(x) for x in obj]
-        if pd.isna(obj): # Handle other pandas NA types
-            return None
-        return obj
-
-    output = clean_nans(output)
-    
-    with open(DATA_DIR / "risk_scores.json", "w") as f:
-        json.dump(output, f, indent=2, default=str)
+    # Every number above comes out of finite()/count() or is rounded from them, so there are no
+    # NaN/inf left to clean; orjson encodes the numpy scalars directly (and would write NaN as null)
+    if ndjson:
+        # One country record per line, so readers can parse it as a stream
+        countries = output.pop("countries")
+        with open(DATA_DIR / "risk_scores.ndjson", "wb") as f:
+            for rec in countries.values():
+                f.write(orjson.dumps(rec, default=json_default, option=JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE))
+        with open(DATA_DIR / "risk_scores.meta.json", "wb") as f:
+            f.write(orjson.dumps(output, default=json_default, option=JSON_OPTIONS | orjson.OPT_INDENT_2))
+        print(f"Done. Scored {len(results)} countries. Saved to risk_scores.ndjson and risk_scores.meta.json")
+        return
+
+    with open(DATA_DIR / "risk_scores.json", "wb") as f:
+        f.write(orjson.dumps(output, default=json_default, option=JSON_OPTIONS | orjson.OPT_INDENT_2))
     
     print(f"Done. Scored {len(results)} countries. Saved to risk_scores.json")
 
 if __name__ == "__main__":
-    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2024
-    compute_all_scores(year)
+    args = [a for a in sys.argv[1:] if a != "--ndjson"]
+    year = int(args[0]) if args else 2024
+    compute_all_scores(year, ndjson="--ndjson" in sys.argv[1:])